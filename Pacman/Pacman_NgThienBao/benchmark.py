@@ -0,0 +1,255 @@
+'''Timing benchmarks for the game, run from the Pacman folder: python Pacman_NgThienBao/benchmark.py'''
+import os
+import sys
+import time
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import pygame
+from constants import *
+import sprites
+from sounds import SoundBank, SOUNDFILES
+
+
+def timeit(func, repeat=20):
+    """Run a function several times and return the average time in milliseconds.
+
+    Args:
+        func (function): The function to time.
+        repeat (int): The number of runs.
+
+    Returns:
+        float: The average time of one run in milliseconds.
+    """
+    start = time.perf_counter()
+    for i in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000.0 / repeat
+
+
+def benchSpritesheet():
+    """Compare loading the spritesheet per sprite object against the shared atlas."""
+    class Dummy(object):
+        name = BLINKY
+        alive = True
+        direction = LEFT
+
+    def levelSprites():
+        entity = Dummy()
+        sprites.PacmanSprites(entity)
+        for name in [BLINKY, PINKY, INKY, CLYDE]:
+            entity.name = name
+            sprites.GhostSprites(entity)
+        sprites.LifeSprites(8)
+        sprites.MazeSprites("maze1.txt", "maze1_rotation.txt")
+
+    cold = timeit(lambda: sprites.SpritesheetAtlas(sprites.SPRITESHEET))
+    print("spritesheet load + scale:        %8.3f ms" % cold)
+    print("level start, sheet per sprite:   %8.3f ms (estimated, 7 loads)" % (cold * 7 + timeit(levelSprites)))
+    print("level start, shared atlas:       %8.3f ms" % timeit(levelSprites))
+    print("fruit spawn, sheet per sprite:   %8.3f ms" % (cold + timeit(lambda: sprites.FruitSprites(Dummy(), 0))))
+    print("fruit spawn, shared atlas:       %8.3f ms" % timeit(lambda: sprites.FruitSprites(Dummy(), 0)))
+
+
+def benchSounds():
+    """Compare the frame time spent on an effect decoded from disk against the sound bank."""
+    def playFromDisk():
+        pygame.mixer.Sound(SOUNDFILES["powerpellet"]).play()
+
+    bank = SoundBank()
+    print("effect decoded from disk:        %8.3f ms per play" % timeit(playFromDisk, repeat=5))
+    print("effect from sound bank:          %8.3f ms per play" % timeit(lambda: bank.play("powerpellet")))
+
+
+def benchRender():
+    """Compare the full redraw against the dirty-rectangle renderer over the same frames."""
+    import run
+    game = run.GameController()
+    game.startGame()
+    game.pause.paused = False
+    for dirty in [False, True]:
+        game.dirtyRender = dirty
+        game.render()
+        print("render, dirtyRender=%-5s:       %8.3f ms per frame" % (dirty, timeit(game.render, repeat=300)))
+
+
+def benchBackground():
+    """Compare drawing the two level backgrounds tile by tile against the background cache."""
+    mazesprites = sprites.MazeSprites("maze1.txt", "maze1_rotation.txt")
+
+    def construct():
+        for y in [0, 5]:
+            mazesprites.constructBackground(pygame.surface.Surface(SCREENSIZE).convert(), y)
+
+    def cached():
+        mazesprites.getBackground(0, OPTIONAL)
+        mazesprites.getBackground(5, BLACK)
+
+    print("backgrounds, drawn per level:    %8.3f ms" % timeit(construct))
+    print("backgrounds, cached:             %8.3f ms" % timeit(cached))
+
+
+def benchMaze():
+    """Compare parsing a maze from text against loading its compiled form."""
+    import mazecompiler
+    from nodes import NodeGroup
+    from pellets import PelletGroup
+    mazefile = "Pacman_NgThienBao/maze1.txt"
+
+    def levelLoad():
+        mazecompiler.compiled.clear()
+        NodeGroup(mazefile)
+        PelletGroup(mazefile)
+        sprites.MazeSprites("maze1.txt", "maze1_rotation.txt")
+
+    print("maze compile from text:          %8.3f ms" % timeit(lambda: mazecompiler.compileMaze(mazefile, "Pacman_NgThienBao/maze1_rotation.txt")))
+    print("level load, compiled from disk:  %8.3f ms" % timeit(levelLoad))
+    mazecompiler.loadMaze(mazefile)
+    print("level load, compiled in memory:  %8.3f ms" % timeit(lambda: (NodeGroup(mazefile), PelletGroup(mazefile))))
+
+
+def benchLargeMaze(size=512):
+    """Measure building the node graph of a generated size x size maze."""
+    import tempfile
+    import numpy as np
+    import mazecompiler
+    from nodes import NodeGroup
+    data = np.full((size, size), 'X')
+    data[::2, :] = '.'
+    data[:, ::4] = '|'
+    data[::2, ::4] = '+'
+    data[::6, 2::12] = 'X'
+    with tempfile.TemporaryDirectory() as folder:
+        mazefile = os.path.join(folder, "maze.txt")
+        np.savetxt(mazefile, data, fmt='%s')
+        data = mazecompiler.readMazeFile(mazefile)
+        print("%dx%d maze, read text:        %8.3f ms" % (size, size, timeit(lambda: mazecompiler.readMazeFile(mazefile), repeat=3)))
+        print("%dx%d maze, compile:          %8.3f ms" % (size, size, timeit(lambda: mazecompiler.compileMaze(mazefile), repeat=3)))
+        blankfile = os.path.join(folder, "blank.txt")
+        np.savetxt(blankfile, np.full((size, size), 'X'), fmt='%s')
+        NodeGroup(blankfile)
+
+        def fromText():
+            # Mỗi lần đo dùng một đồ thị mới, bắt đầu từ mê cung trống
+            nodes = NodeGroup(blankfile)
+            nodes.createNodeTable(data)
+            nodes.connectHorizontally(data)
+            nodes.connectVertically(data)
+            return nodes
+        print("%dx%d maze, nodes from text:  %8.3f ms" % (size, size, timeit(fromText, repeat=3)))
+        print("%dx%d maze, nodes from cache: %8.3f ms (%d nodes)" % (size, size, timeit(lambda: NodeGroup(mazefile), repeat=3), fromText().numNodes))
+
+
+def benchVectors():
+    """Count the Vector2 objects made per frame by the simulation, and time the vector operations."""
+    from vector import Vector2
+    from simulation import Simulation
+    created = [0]
+    init = Vector2.__init__
+
+    def countingInit(self, *args):
+        created[0] += 1
+        init(self, *args)
+
+    sim = Simulation()
+    sim.startGame()
+    directions = [LEFT, UP, RIGHT, DOWN]
+    frames = 2000
+    Vector2.__init__ = countingInit
+    try:
+        for i in range(frames):
+            sim.update(1.0 / 30, directions[(i // 20) % 4])
+    finally:
+        Vector2.__init__ = init
+    print("Vector2 objects per frame:       %8.1f" % (created[0] / float(frames)))
+    position, direction = Vector2(1.5, 2.5), Vector2(1, 0)
+
+    def addOperators():
+        p = position
+        for i in range(1000):
+            p = p + direction * 2.0 * 0.03
+
+    def addInPlace():
+        p = position.copy()
+        for i in range(1000):
+            p.iaddScaled(direction, 2.0 * 0.03)
+
+    print("1000 moves, operators:           %8.3f ms" % timeit(addOperators))
+    if hasattr(Vector2, "iaddScaled"):
+        print("1000 moves, in place:            %8.3f ms" % timeit(addInPlace))
+
+
+def benchCrowd(size=400):
+    """Compare updating many Ghost objects against a GhostCrowd of the same size."""
+    from simulation import Simulation
+    from ghosts import Blinky, Pinky, Inky, Clyde
+    from crowd import GhostCrowd
+    sim = Simulation()
+    sim.startGame()
+    kinds = [Blinky, Pinky, Inky, Clyde]
+    ghosts = []
+    for i in range(size):
+        ghost = kinds[i % 4](sim.ghosts.ghosts[i % 4].startNode, sim.pacman, sim.ghosts.blinky)
+        ghost.setSpawnNode(sim.ghosts.blinky.spawnNode)
+        ghosts.append(ghost)
+    crowd = GhostCrowd(sim.nodes, sim.pacman, sim.ghosts, size)
+
+    def updateGhosts():
+        for ghost in ghosts:
+            ghost.update(1.0 / 30)
+
+    print("%d Ghost objects:               %8.3f ms per frame" % (size, timeit(updateGhosts, repeat=100)))
+    print("GhostCrowd of %d:               %8.3f ms per frame" % (size, timeit(lambda: crowd.update(1.0 / 30), repeat=100)))
+
+
+def benchCollisions(size=400):
+    """Compare checking Pacman against every ghost of a crowd against checking the ghosts near him."""
+    import numpy as np
+    from simulation import Simulation
+    sim = Simulation(crowdSize=size)
+    sim.startGame()
+    for i in range(300):
+        sim.update(1.0 / 30, LEFT)
+    crowd, pacman = sim.crowd, sim.pacman
+
+    def everyGhost():
+        d = (crowd.positions[:, 0] - pacman.position.x)**2 + (crowd.positions[:, 1] - pacman.position.y)**2
+        return np.nonzero(d <= (pacman.collideRadius + crowd.collideRadius)**2)[0].tolist()
+
+    print("%d ghosts, every ghost:          %8.3f ms" % (size, timeit(everyGhost, repeat=1000)))
+    print("%d ghosts, spatial hash:         %8.3f ms" % (size, timeit(lambda: crowd.collide(pacman.position, pacman.collideRadius), repeat=1000)))
+
+
+def benchSimulation():
+    """Measure how many frames per second the headless simulation can step."""
+    from simulation import Simulation
+    sim = Simulation(seed=1)
+    sim.startGame()
+    directions = [LEFT, UP, RIGHT, DOWN]
+    frames = 5000
+    start = time.perf_counter()
+    for i in range(frames):
+        sim.update(1.0 / 30, directions[(i // 20) % 4])
+    print("headless simulation:             %8.0f frames per second" % (frames / (time.perf_counter() - start)))
+
+
+def benchSnapshot():
+    """Measure capturing and restoring the state of a game, as a search agent does for every move it tries."""
+    from simulation import Simulation
+    sim = Simulation(seed=1)
+    sim.startGame()
+    for i in range(300):
+        sim.update(1.0 / 30, LEFT)
+    state = sim.snapshot()
+    print("snapshot:                        %8.1f us" % (timeit(sim.snapshot, repeat=10000) * 1000))
+    print("restore:                         %8.1f us" % (timeit(lambda: sim.restore(state), repeat=10000) * 1000))
+
+
+if __name__ == "__main__":
+    pygame.init()
+    pygame.mixer.init()
+    pygame.display.set_mode(SCREENSIZE, 0, 32)
+    benches = {"spritesheet": benchSpritesheet, "sounds": benchSounds,
+               "render": benchRender, "background": benchBackground, "maze": benchMaze, "largemaze": benchLargeMaze, "vectors": benchVectors, "crowd": benchCrowd, "collisions": benchCollisions, "simulation": benchSimulation, "snapshot": benchSnapshot}
+    for name in (sys.argv[1:] or list(benches.keys())):
+        print("== " + name)
+        benches[name]()
@@ -26,6 +26,9 @@ DOWN = -1
 LEFT = 2
 RIGHT = -2
 PORTAL = 3 
+#vị trí của mỗi hướng trong các mảng của NodeGroup
+DIRECTIONINDEX = {UP:0, DOWN:1, LEFT:2, RIGHT:3, PORTAL:4}
+MOVEDIRECTIONS = [UP, DOWN, LEFT, RIGHT]
 
 PACMAN = 0
 PELLET = 1
@@ -0,0 +1,440 @@
+import numpy as np
+from constants import *
+from sprites import CrowdSprites
+from spatial import SpatialHash
+from gamerandom import GameRandom
+
+# Hàng theo hướng + 2: RIGHT, DOWN, STOP, UP, LEFT
+VECTORS = np.array([[1, 0], [0, 1], [0, 0], [0, -1], [-1, 0]], dtype=np.float64)
+COLUMNS = np.array([DIRECTIONINDEX[RIGHT], DIRECTIONINDEX[DOWN], -1, DIRECTIONINDEX[UP], DIRECTIONINDEX[LEFT]])
+MOVES = np.array(MOVEDIRECTIONS)
+MOVEVECTORS = VECTORS[MOVES + 2]
+KINDS = [BLINKY, PINKY, INKY, CLYDE]
+# Các mảng thay đổi trong lúc chơi, lưu lại bởi getState
+STATEFIELDS = ["positions", "previousPositions", "directions", "speeds", "nodeIds", "targetIds", "travelled",
+               "edgeLengths", "modes", "mainModes", "mainTimers", "mainTimes", "freightTimers", "goals"]
+
+
+def blinkyGoal(crowd, ids, pacman):
+    """Blinky aims at Pacman.
+
+    Args:
+        crowd (GhostCrowd): The crowd the ghosts belong to.
+        ids (numpy.ndarray): The indices of the ghosts.
+        pacman (Pacman): The Pacman object in the game.
+
+    Returns:
+        numpy.ndarray: The (len(ids), 2) goals.
+    """
+    return np.tile([pacman.position.x, pacman.position.y], (len(ids), 1))
+
+
+def pinkyGoal(crowd, ids, pacman):
+    """Pinky aims four tiles ahead of Pacman.
+
+    Args:
+        crowd (GhostCrowd): The crowd the ghosts belong to.
+        ids (numpy.ndarray): The indices of the ghosts.
+        pacman (Pacman): The Pacman object in the game.
+
+    Returns:
+        numpy.ndarray: The (len(ids), 2) goals.
+    """
+    ahead = pacman.directions[pacman.direction]
+    goal = [pacman.position.x + ahead.x * (TILEWIDTH * 4), pacman.position.y + ahead.y * (TILEWIDTH * 4)]
+    return np.tile(goal, (len(ids), 1))
+
+
+def inkyGoal(crowd, ids, pacman):
+    """Inky aims at twice the vector from its partner Blinky to two tiles ahead of Pacman.
+
+    Args:
+        crowd (GhostCrowd): The crowd the ghosts belong to.
+        ids (numpy.ndarray): The indices of the ghosts.
+        pacman (Pacman): The Pacman object in the game.
+
+    Returns:
+        numpy.ndarray: The (len(ids), 2) goals.
+    """
+    ahead = pacman.directions[pacman.direction]
+    goal = np.array([pacman.position.x + ahead.x * (TILEWIDTH * 2), pacman.position.y + ahead.y * (TILEWIDTH * 2)])
+    blinky = crowd.positions[crowd.partners[ids]]
+    return (goal - blinky) * 2 + blinky
+
+
+def clydeGoal(crowd, ids, pacman):
+    """Clyde aims like Pinky, but heads for his corner within eight tiles of Pacman.
+
+    Args:
+        crowd (GhostCrowd): The crowd the ghosts belong to.
+        ids (numpy.ndarray): The indices of the ghosts.
+        pacman (Pacman): The Pacman object in the game.
+
+    Returns:
+        numpy.ndarray: The (len(ids), 2) goals.
+    """
+    goals = pinkyGoal(crowd, ids, pacman)
+    near = ((pacman.position.x - crowd.positions[ids, 0])**2 + (pacman.position.y - crowd.positions[ids, 1])**2) <= (TILEWIDTH * 8)**2
+    goals[near] = SCATTERGOALS[CLYDE]
+    return goals
+
+
+CHASEGOALS = {BLINKY:blinkyGoal, PINKY:pinkyGoal, INKY:inkyGoal, CLYDE:clydeGoal}
+SCATTERGOALS = {BLINKY:(0, 0), PINKY:(TILEWIDTH*NCOLS, 0),
+                INKY:(TILEWIDTH*NCOLS, TILEHEIGHT*NROWS), CLYDE:(0, TILEHEIGHT*NROWS)}
+
+
+class GhostCrowd(object):
+    """
+    Many ghosts stored as a structure of arrays and advanced together with NumPy,
+    for the crowd mode where hundreds of ghosts would be too slow as Ghost objects.
+    Each ghost follows the rules of the Ghost of its kind: the same modes, speeds,
+    node access and goals, with the chase goals given by the functions in CHASEGOALS.
+
+    Attributes:
+        nodes (NodeGroup): The node graph of the level.
+        pacman (Pacman): The Pacman object in the game.
+        rng (GameRandom): The random generator of the game, for Freight mode directions.
+        names (numpy.ndarray): The kind (BLINKY, PINKY, INKY or CLYDE) of each ghost.
+        partners (numpy.ndarray): The index of the Blinky each ghost follows in Inky's chase goal.
+        positions (numpy.ndarray): The (N, 2) positions of the ghosts.
+        previousPositions (numpy.ndarray): The positions before the last simulation tick.
+        directions (numpy.ndarray): The direction of each ghost.
+        speeds (numpy.ndarray): The speed of each ghost.
+        nodeIds (numpy.ndarray): The id of the node each ghost comes from.
+        targetIds (numpy.ndarray): The id of the node each ghost is heading to.
+        travelled (numpy.ndarray): The distance each ghost has moved from its node.
+        edgeLengths (numpy.ndarray): The length of the edge each ghost is on, 0 when stopped on a node.
+        startIds (numpy.ndarray): The id of the start node of each ghost.
+        spawnId (int): The id of the node eaten ghosts return to.
+        homeId (int): The id of the node at the entrance of the ghost home.
+        modes (numpy.ndarray): The current mode of each ghost.
+        mainModes (numpy.ndarray): The SCATTER or CHASE mode each ghost goes back to.
+        mainTimers (numpy.ndarray): The time each ghost has spent in its main mode.
+        mainTimes (numpy.ndarray): The length of the current main mode of each ghost.
+        freightTimers (numpy.ndarray): The time each ghost has spent in Freight mode.
+        goals (numpy.ndarray): The (N, 2) goal positions of the ghosts.
+        points (int): The points awarded for the next ghost eaten in Freight mode.
+        collideRadius (int): The collision radius of a ghost.
+        collisions (SpatialHash): The ghosts by the edge they are on, keyed by index.
+        visible (bool): Flag indicating whether the ghosts are drawn.
+        sprites (CrowdSprites): The images of the ghosts, or None when running headless.
+    """
+
+    def __init__(self, nodes, pacman, ghosts, size, rng=None):
+        """
+        Initializes a GhostCrowd object. Ghost i is of kind KINDS[i % 4] and starts
+        on the start node of the ghost of that kind in the group.
+
+        Args:
+            nodes (NodeGroup): The node graph of the level.
+            pacman (Pacman): The Pacman object in the game.
+            ghosts (GhostGroup): The ghost group, giving the start and spawn nodes.
+            size (int): The number of ghosts.
+            rng (GameRandom): The random generator of the game, or None for a new unseeded one.
+        """
+        self.nodes = nodes
+        self.pacman = pacman
+        self.rng = rng if rng is not None else GameRandom()
+        self.names = np.array([KINDS[i % 4] for i in range(size)], dtype=np.int32)
+        starts = {ghost.name: ghost.startNode.id for ghost in ghosts}
+        self.startIds = np.array([starts[name] for name in self.names.tolist()], dtype=np.int32)
+        self.spawnId = ghosts.blinky.spawnNode.id
+        self.homeId = nodes.nodesLUT[nodes.homekey]
+        self.partners = np.arange(size)
+        blinkies = np.nonzero(self.names == BLINKY)[0]
+        if len(blinkies) > 0:
+            self.partners[:] = blinkies[np.searchsorted(blinkies, np.arange(size), side='right').clip(1) - 1]
+        self.positions = np.zeros((size, 2))
+        self.previousPositions = np.zeros((size, 2))
+        self.directions = np.zeros(size, dtype=np.int32)
+        self.speeds = np.zeros(size)
+        self.nodeIds = np.zeros(size, dtype=np.int32)
+        self.targetIds = np.zeros(size, dtype=np.int32)
+        self.travelled = np.zeros(size)
+        self.edgeLengths = np.zeros(size)
+        self.modes = np.full(size, SCATTER, dtype=np.int32)
+        self.mainModes = np.full(size, SCATTER, dtype=np.int32)
+        self.mainTimers = np.zeros(size)
+        self.mainTimes = np.full(size, 7.0)
+        self.freightTimers = np.zeros(size)
+        self.goals = np.zeros((size, 2))
+        self.collideRadius = 5
+        self.collisions = SpatialHash(nodes)
+        self.visible = True
+        self.sprites = CrowdSprites()
+        self.reset()
+
+    def __len__(self):
+        """
+        Returns the number of ghosts in the crowd.
+        """
+        return len(self.names)
+
+    def reset(self):
+        """
+        Puts every ghost back on its start node, stopped, at normal speed.
+        """
+        self.nodeIds[:] = self.startIds
+        self.targetIds[:] = self.startIds
+        self.positions[:] = self.nodes.positions[self.startIds]
+        self.previousPositions[:] = self.positions
+        self.directions[:] = STOP
+        self.travelled[:] = 0
+        self.edgeLengths[:] = 0
+        self.speeds[:] = 100
+        self.points = 200
+        self.visible = True
+        self.collisions.moveMany(range(len(self)), self.startIds, self.startIds)
+
+    def setSpeed(self, ids, speed):
+        """
+        Sets the speed of some ghosts.
+
+        Args:
+            ids (numpy.ndarray): The indices or mask of the ghosts.
+            speed (float): The speed in pixels per second at the original tile size.
+        """
+        self.speeds[ids] = speed * TILEWIDTH / 16
+
+    def update(self, dt):
+        """
+        Advances every ghost by one frame.
+
+        Args:
+            dt (float): Time elapsed since the last frame.
+        """
+        self.updateModes(dt)
+        self.updateGoals()
+        steps = np.where(self.directions != STOP, self.speeds * dt, 0)
+        self.positions += VECTORS[self.directions + 2] * steps[:, None]
+        self.travelled += steps
+        ids = np.nonzero(self.travelled >= self.edgeLengths)[0]
+        if len(ids) > 0:
+            self.arrive(ids)
+
+    def updateModes(self, dt):
+        """
+        Runs the mode timers of every ghost, as ModeController.update does for one ghost.
+
+        Args:
+            dt (float): Time elapsed since the last frame.
+        """
+        self.mainTimers += dt
+        switch = self.mainTimers >= self.mainTimes
+        toChase = switch & (self.mainModes == SCATTER)
+        toScatter = switch & (self.mainModes == CHASE)
+        self.mainModes[toChase] = CHASE
+        self.mainTimes[toChase] = 20
+        self.mainModes[toScatter] = SCATTER
+        self.mainTimes[toScatter] = 7
+        self.mainTimers[switch] = 0
+
+        freight = self.modes == FREIGHT
+        normal = (self.modes == SCATTER) | (self.modes == CHASE)
+        self.freightTimers[freight] += dt
+        ending = freight & (self.freightTimers >= 7)
+        self.setSpeed(ending, 100)
+        self.modes[ending | normal] = self.mainModes[ending | normal]
+        home = (self.modes == SPAWN) & (self.nodeIds == self.spawnId)
+        self.setSpeed(home, 100)
+        self.modes[home] = self.mainModes[home]
+
+    def updateGoals(self):
+        """
+        Sets the goals of the ghosts in Scatter and Chase mode.
+        """
+        for name in KINDS:
+            kind = self.names == name
+            scatter = np.nonzero(kind & (self.modes == SCATTER))[0]
+            self.goals[scatter] = SCATTERGOALS[name]
+            chase = np.nonzero(kind & (self.modes == CHASE))[0]
+            if len(chase) > 0:
+                self.goals[chase] = CHASEGOALS[name](self, chase, self.pacman)
+
+    def getValidMasks(self, ids):
+        """
+        Returns the directions some ghosts may leave their nodes in, as bitmasks.
+        Ghosts in Spawn mode may also enter the home.
+
+        Args:
+            ids (numpy.ndarray): The indices of the ghosts.
+
+        Returns:
+            numpy.ndarray: The bitmask of each ghost, bit i for MOVEDIRECTIONS[i].
+        """
+        masks = np.zeros(len(ids), dtype=np.int32)
+        for name in KINDS:
+            kind = self.names[ids] == name
+            if kind.any():
+                table = np.array(self.nodes.getValidTable(name)[0], dtype=np.int32)
+                masks[kind] = table[self.nodeIds[ids[kind]]]
+        entering = (self.modes[ids] == SPAWN) & (self.nodeIds[ids] == self.homeId)
+        if self.nodes.neighborIds[self.homeId, DIRECTIONINDEX[DOWN]] >= 0:
+            masks[entering] |= 1 << DIRECTIONINDEX[DOWN]
+        return masks
+
+    def arrive(self, ids):
+        """
+        Moves the ghosts that reached their target onto it, and picks their next
+        direction and target as Entity.update does.
+
+        Args:
+            ids (numpy.ndarray): The indices of the ghosts that overshot their target.
+        """
+        self.nodeIds[ids] = self.targetIds[ids]
+        masks = self.getValidMasks(ids)
+        reverse = -self.directions[ids]
+        revcolumns = COLUMNS[reverse + 2]
+        allowed = (masks[:, None] >> np.arange(4)) & 1 == 1
+        allowed[revcolumns >= 0, revcolumns[revcolumns >= 0]] = False
+        trapped = ~allowed.any(axis=1)
+
+        freight = self.modes[ids] == FREIGHT
+        columns = np.zeros(len(ids), dtype=np.int64)
+        if freight.any():
+            choice = self.rng.integers(allowed[freight].sum(axis=1))
+            ranks = np.cumsum(allowed[freight], axis=1) - 1
+            columns[freight] = np.argmax(allowed[freight] & (ranks == choice[:, None]), axis=1)
+        if (~freight).any():
+            chasing = ids[~freight]
+            ahead = self.nodes.positions[self.nodeIds[chasing]][:, None, :] + MOVEVECTORS[None, :, :] * TILEWIDTH
+            distances = ((ahead - self.goals[chasing][:, None, :])**2).sum(axis=2)
+            distances[~allowed[~freight]] = np.inf
+            columns[~freight] = np.argmin(distances, axis=1)
+        chosen = np.where(trapped, reverse, MOVES[columns])
+
+        portals = self.nodes.neighborIds[self.nodeIds[ids], DIRECTIONINDEX[PORTAL]]
+        self.nodeIds[ids] = np.where(portals >= 0, portals, self.nodeIds[ids])
+        masks = self.getValidMasks(ids)
+        current = self.directions[ids]
+        valid, targets = self.getTargets(ids, chosen, masks)
+        keeping, kept = self.getTargets(ids, current, masks)
+        self.directions[ids] = np.where(valid, chosen, current)
+        self.targetIds[ids] = np.where(valid, targets, np.where(keeping, kept, self.nodeIds[ids]))
+        self.positions[ids] = self.nodes.positions[self.nodeIds[ids]]
+        columns = COLUMNS[self.directions[ids] + 2]
+        lengths = self.nodes.getEdgeLengths()[0][self.nodeIds[ids], columns.clip(0)]
+        self.travelled[ids] = 0
+        self.edgeLengths[ids] = np.where(self.targetIds[ids] == self.nodeIds[ids], 0, lengths)
+        self.collisions.moveMany(ids.tolist(), self.nodeIds[ids], self.targetIds[ids])
+
+    def getTargets(self, ids, directions, masks):
+        """
+        Looks up the neighbors some ghosts would head to, as Entity.getNewTarget does.
+
+        Args:
+            ids (numpy.ndarray): The indices of the ghosts.
+            directions (numpy.ndarray): The direction of each ghost.
+            masks (numpy.ndarray): The valid direction bitmask of each ghost.
+
+        Returns:
+            tuple: A mask of the ghosts that may move in their direction, and their neighbor ids.
+        """
+        columns = COLUMNS[directions + 2]
+        valid = (columns >= 0) & ((masks >> columns.clip(0)) & 1 == 1)
+        return valid, self.nodes.neighborIds[self.nodeIds[ids], columns.clip(0)]
+
+    def getArrivalTimes(self):
+        """
+        Predicts when each ghost reaches its target at its current speed, as Entity.timeToArrival does.
+
+        Returns:
+            numpy.ndarray: The time in seconds for each ghost, 0 if it is due now, or infinity if it is not moving.
+        """
+        remaining = self.edgeLengths - self.travelled
+        moving = (self.directions != STOP) & (self.speeds > 0)
+        times = np.full(len(self), np.inf)
+        times[moving] = remaining[moving] / self.speeds[moving]
+        times[remaining <= 0] = 0
+        return times
+
+    def startFreight(self):
+        """
+        Starts Freight mode for the ghosts in Scatter, Chase or Freight mode.
+        """
+        freight = (self.modes == SCATTER) | (self.modes == CHASE) | (self.modes == FREIGHT)
+        self.modes[freight] = FREIGHT
+        self.freightTimers[freight] = 0
+        self.setSpeed(freight, 50)
+        self.points = 200
+
+    def startSpawn(self, i):
+        """
+        Sends an eaten ghost back to the spawn node.
+
+        Args:
+            i (int): The index of the ghost.
+        """
+        if self.modes[i] == FREIGHT:
+            self.modes[i] = SPAWN
+            self.setSpeed(i, 150)
+            self.goals[i] = self.nodes.positions[self.spawnId]
+
+    def collide(self, position, radius):
+        """
+        Finds the ghosts touching a circle, only checking the ghosts near it.
+
+        Args:
+            position (Vector2): The centre of the circle.
+            radius (float): The radius of the circle, less than a tile minus collideRadius.
+
+        Returns:
+            list: The indices of the ghosts touching the circle.
+        """
+        near = self.collisions.nearby(position)
+        if not near:
+            return []
+        ids = np.sort(np.fromiter(near, dtype=np.int64, count=len(near)))
+        d = (self.positions[ids, 0] - position.x)**2 + (self.positions[ids, 1] - position.y)**2
+        return ids[d <= (radius + self.collideRadius)**2].tolist()
+
+    def getState(self):
+        """
+        Returns a copy of the state of the crowd.
+
+        Returns:
+            tuple: A copy of each array in STATEFIELDS, the points and the visibility.
+        """
+        return [getattr(self, name).copy() for name in STATEFIELDS], self.points, self.visible
+
+    def setState(self, state):
+        """
+        Puts the crowd back in a state returned by getState.
+
+        Args:
+            state (tuple): The arrays, the points and the visibility.
+        """
+        arrays, self.points, self.visible = state
+        for name, array in zip(STATEFIELDS, arrays):
+            getattr(self, name)[:] = array
+        self.collisions.moveMany(range(len(self)), self.nodeIds, self.targetIds)
+
+    def savePositions(self):
+        """
+        Remembers the current positions before a simulation tick.
+        """
+        self.previousPositions[:] = self.positions
+
+    def render(self, screen, alpha=1.0):
+        """
+        Draws the ghosts between their last two positions.
+
+        Args:
+            screen (pygame.Surface): The surface to render on.
+            alpha (float): How far between the previous and current simulation tick to draw the ghosts.
+
+        Returns:
+            list: The (image, rect) pairs that were drawn.
+        """
+        drawn = []
+        if not self.visible or self.sprites is None:
+            return drawn
+        step = self.positions - self.previousPositions
+        jumped = (step**2).sum(axis=1) > (2 * TILEWIDTH) ** 2
+        positions = np.where(jumped[:, None], self.positions, self.previousPositions + step * alpha)
+        positions -= (TILEWIDTH / 2, TILEHEIGHT / 2)
+        images = self.sprites.getImages(self.names, self.modes, self.directions)
+        for image, position in zip(images, positions.tolist()):
+            drawn.append((image, screen.blit(image, position)))
+        return drawn
@@ -2,7 +2,7 @@ import pygame
 from pygame.locals import *
 from vector import Vector2
 from constants import *
-from random import randint
+from gamerandom import GameRandom
 
 class Entity(object):
     """Represents an entity in the game, useful for Ghosts to chase Pacman.
@@ -22,16 +22,22 @@ class Entity(object):
         startNode (Node): The starting node of the entity.
         target (Node): The target node the entity is moving towards.
         position (Vector2): The current position of the entity.
+        travelled (float): The distance moved from the node towards the target.
+        edgeLength (float): The length of the edge from the node to the target, 0 when stopped on a node.
+        previousPosition (Vector2): The position before the last simulation tick, used to interpolate rendering.
         image (Surface): The image used to represent the entity.
+        rng (GameRandom): The random generator of the game, used for random directions.
     """
 
-    def __init__(self, node):
+    def __init__(self, node, rng=None):
         """Initializes a new instance of the Entity class.
 
         Args:
             node (Node): The starting node of the entity.
+            rng (GameRandom): The random generator of the game, or None for a new unseeded one.
         """
         self.name = None
+        self.rng = rng if rng is not None else GameRandom()
         self.directions = {UP:Vector2(0, -1),DOWN:Vector2(0, 1), 
                           LEFT:Vector2(-1, 0), RIGHT:Vector2(1, 0), STOP:Vector2()}
         self.direction = STOP
@@ -44,11 +50,37 @@ class Entity(object):
         self.goal = None
         self.directionMethod = self.randomDirection
         self.setStartNode(node)
+        self.previousPosition = None
         self.image = None
 
     def setPosition(self):
-        """Sets the position of the entity to the position of the current node."""
+        """Sets the position of the entity to the position of the current node,
+        at the start of the edge to the target."""
         self.position = self.node.position.copy()
+        self.travelled = 0.0
+        self.measureEdge(self.direction)
+
+    def measureEdge(self, direction):
+        """Looks up the length of the edge from the node to the target.
+
+        Args:
+            direction (int): The direction of the target from the node.
+        """
+        if self.target is self.node:
+            self.edgeLength = 0.0
+        else:
+            self.edgeLength = self.node.group.getEdgeLengths()[1][self.node.id][DIRECTIONINDEX[direction]]
+
+    def move(self, dt):
+        """Moves the entity along its edge based on its current direction and speed.
+
+        Args:
+            dt (float): The time elapsed since the last update in seconds.
+        """
+        if self.direction != STOP:
+            step = self.speed * dt
+            self.position.iaddScaled(self.directions[self.direction], step)
+            self.travelled += step
 
     def update(self, dt):
         """Updates the position of the entity based on its current direction and speed.
@@ -56,7 +88,7 @@ class Entity(object):
         Args:
             dt (float): The time elapsed since the last update in seconds.
         """
-        self.position += self.directions[self.direction] * self.speed * dt
+        self.move(dt)
 
         if self.overshotTarget():
             self.node = self.target
@@ -83,9 +115,8 @@ class Entity(object):
             bool: True if the direction is valid, False otherwise.
         """
         if direction is not STOP:
-            if self.name in self.node.access[direction]:
-                if self.node.neighbors[direction] is not None:
-                    return True
+            masks = self.node.group.getValidTable(self.name)[0]
+            return (masks[self.node.id] >> DIRECTIONINDEX[direction]) & 1 == 1
         return False
 
     def getNewTarget(self, direction):
@@ -108,19 +139,29 @@ class Entity(object):
             bool: True if the entity has overshot its target, False otherwise.
         """
         if self.target is not None:
-            vec1 = self.target.position - self.node.position
-            vec2 = self.position - self.node.position
-            node2Target = vec1.magnitudeSquared()
-            node2Self = vec2.magnitudeSquared()
-            return node2Self >= node2Target
+            return self.travelled >= self.edgeLength
         return False
 
+    def timeToArrival(self):
+        """Predicts when the entity reaches its target at its current speed.
+
+        Returns:
+            float: The time in seconds, 0 if it is due now, or infinity if it is not moving.
+        """
+        remaining = self.edgeLength - self.travelled
+        if remaining <= 0:
+            return 0.0
+        if self.direction == STOP or self.speed <= 0:
+            return float('inf')
+        return remaining / self.speed
+
     def reverseDirection(self):
         """Reverses the direction of the entity and swaps the current node and target node."""
         self.direction *= -1
         temp = self.node
         self.node = self.target
         self.target = temp
+        self.travelled = self.edgeLength - self.travelled
 
     def oppositeDirection(self, direction):
         """Checks if the given direction is opposite to the current direction of the entity.
@@ -142,11 +183,8 @@ class Entity(object):
         Returns:
             list: A list of valid directions.
         """
-        directions = []
-        for key in [UP, DOWN, LEFT, RIGHT]:
-            if self.validDirection(key):
-                if key != self.direction * -1:
-                    directions.append(key)
+        valid = self.node.group.getValidTable(self.name)[1][self.node.id]
+        directions = [key for key in valid if key != self.direction * -1]
         if len(directions) == 0:
             directions.append(self.direction * -1)
         return directions
@@ -160,7 +198,7 @@ class Entity(object):
         Returns:
             int: The randomly chosen direction.
         """
-        return directions[randint(0, len(directions)-1)]
+        return directions[self.rng.randint(len(directions))]
 
     def goalDirection(self, directions):
         """Chooses a direction based on the goal for the entity.
@@ -172,9 +210,12 @@ class Entity(object):
             int: The chosen direction based on the goal.
         """
         distances = []
+        position = self.node.position
         for direction in directions:
-            vec = self.node.position + self.directions[direction] * TILEWIDTH - self.goal
-            distances.append(vec.magnitudeSquared())
+            step = self.directions[direction]
+            x = position.x + step.x * TILEWIDTH - self.goal.x
+            y = position.y + step.y * TILEWIDTH - self.goal.y
+            distances.append(x**2 + y**2)
         index = distances.index(min(distances))
         return directions[index]
 
@@ -198,6 +239,8 @@ class Entity(object):
         if self.node.neighbors[direction] is not None:
             self.target = self.node.neighbors[direction]
             self.position = (self.node.position + self.target.position) / 2.0
+            self.measureEdge(direction)
+            self.travelled = self.edgeLength / 2.0
 
     def reset(self):
         """Resets the entity to its initial state."""
@@ -214,17 +257,79 @@ class Entity(object):
         """
         self.speed = speed * TILEWIDTH / 16
 
-    def render(self, screen):
+    def getState(self):
+        """Gets the state of the entity that changes during a game, as numbers.
+        Nodes are stored by id, so the node graph is shared and never copied.
+
+        Returns:
+            list: The position, node id, target id, direction, speed, distance travelled,
+                edge length and visibility of the entity.
+        """
+        return [self.position.x, self.position.y, self.node.id, self.target.id, self.direction,
+                self.speed, self.travelled, self.edgeLength, self.visible]
+
+    def setState(self, values, start=0):
+        """Puts the entity back in a state returned by getState.
+
+        Args:
+            values (list): The numbers of the state.
+            start (int): The index of the first number of the entity in values.
+
+        Returns:
+            int: The index after the last number of the entity.
+        """
+        group = self.node.group
+        self.position.set(values[start], values[start+1])
+        self.node = group.getNode(int(values[start+2]))
+        self.target = group.getNode(int(values[start+3]))
+        self.direction = int(values[start+4])
+        self.speed = values[start+5]
+        self.travelled = values[start+6]
+        self.edgeLength = values[start+7]
+        self.visible = bool(values[start+8])
+        return start + 9
+
+    def savePosition(self):
+        """Remembers the current position before a simulation tick."""
+        if self.previousPosition is None:
+            self.previousPosition = self.position.copy()
+        else:
+            self.previousPosition.set(self.position.x, self.position.y)
+
+    def interpolate(self, alpha):
+        """Gets the position between the last two simulation ticks.
+
+        Jumps longer than two tiles (portals, resets) are not interpolated.
+
+        Args:
+            alpha (float): How far between the previous and current tick, from 0 to 1.
+
+        Returns:
+            Vector2: The interpolated position.
+        """
+        if self.previousPosition is None:
+            return self.position
+        dx = self.position.x - self.previousPosition.x
+        dy = self.position.y - self.previousPosition.y
+        if dx**2 + dy**2 > (2 * TILEWIDTH) ** 2:
+            return self.position
+        return Vector2(self.previousPosition.x + dx * alpha, self.previousPosition.y + dy * alpha)
+
+    def render(self, screen, alpha=1.0):
         """Renders the entity on the screen.
 
         Args:
             screen (Surface): The surface to render on.
+            alpha (float): How far between the previous and current simulation tick to draw the entity.
+
+        Returns:
+            Rect or None: The area drawn on, or None if the entity is hidden.
         """
         if self.visible:
+            position = self.interpolate(alpha)
             if self.image is not None:
-                adjust = Vector2(TILEWIDTH, TILEHEIGHT) / 2
-                p = self.position - adjust
-                screen.blit(self.image, p.asTuple())
+                return screen.blit(self.image, (position.x - TILEWIDTH / 2, position.y - TILEHEIGHT / 2))
             else:
-                p = self.position.asInt()
-                pygame.draw.circle(screen, self.color, p, self.radius)
+                p = position.asInt()
+                return pygame.draw.circle(screen, self.color, p, self.radius)
+        return None
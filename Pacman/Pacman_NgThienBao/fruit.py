@@ -17,18 +17,20 @@ class Fruit(Entity):
         destroy (bool): Flag indicating if the fruit should be destroyed.
         points (int): The points awarded for collecting the fruit.
         sprites (FruitSprites): The sprites representing the fruit.
+        rng (GameRandom): The random generator of the game.
 
     """
 
-    def __init__(self, node, level=0):
+    def __init__(self, node, level=0, rng=None):
         """Initialize a Fruit object.
 
         Args:
             node (Node): The node where the fruit is located.
             level (int, optional): The level of the game. Defaults to 0.
+            rng (GameRandom, optional): The random generator of the game. Defaults to None.
 
         """
-        Entity.__init__(self, node)
+        Entity.__init__(self, node, rng)
         self.name = FRUIT
         self.color = GREEN
         self.lifespan = 5
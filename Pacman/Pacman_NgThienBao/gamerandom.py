@@ -0,0 +1,99 @@
+import numpy as np
+
+BUFFERSIZE = 1024
+
+
+class GameRandom(object):
+    """
+    The random generator of one game, so every random choice of a game can be
+    repeated from its seed. Single draws are served from a buffer of numbers
+    drawn in one batch, and many entities can draw a whole array at once.
+
+    Attributes:
+        seed (int): The seed of the generator, chosen at random when none is given.
+        generator (numpy.random.Generator): The NumPy generator all numbers come from.
+        buffer (list): The numbers drawn in the last batch, in [0, 1).
+        index (int): The position of the next unused number in the buffer.
+    """
+
+    def __init__(self, seed=None):
+        """
+        Initializes a GameRandom object.
+
+        Args:
+            seed (int): The seed, or None to pick one.
+        """
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1, dtype=np.uint64)[0] >> 1)
+        self.seed = seed
+        self.generator = np.random.default_rng(seed)
+        self.buffer = []
+        self.index = 0
+
+    def uniform(self):
+        """
+        Draws one number.
+
+        Returns:
+            float: A number in [0, 1).
+        """
+        if self.index >= len(self.buffer):
+            self.buffer = self.generator.random(BUFFERSIZE).tolist()
+            self.index = 0
+        value = self.buffer[self.index]
+        self.index += 1
+        return value
+
+    def randint(self, n):
+        """
+        Draws one index.
+
+        Args:
+            n (int): The number of choices.
+
+        Returns:
+            int: A number from 0 to n - 1.
+        """
+        return int(self.uniform() * n)
+
+    def getState(self):
+        """
+        Returns the state of the generator, to draw the same numbers again later.
+
+        Returns:
+            tuple: The state of the NumPy generator, the buffer and the position in it.
+        """
+        return self.generator.bit_generator.state, self.buffer, self.index
+
+    def setState(self, state):
+        """
+        Puts the generator back in a state returned by getState.
+
+        Args:
+            state (tuple): The state of the NumPy generator, the buffer and the position in it.
+        """
+        self.generator.bit_generator.state, self.buffer, self.index = state
+
+    def random(self, size):
+        """
+        Draws many numbers at once, for batches of entities.
+
+        Args:
+            size (int): The number of numbers.
+
+        Returns:
+            numpy.ndarray: The numbers, in [0, 1).
+        """
+        return self.generator.random(size)
+
+    def integers(self, counts):
+        """
+        Draws one index per entity at once.
+
+        Args:
+            counts (numpy.ndarray): The number of choices of each entity.
+
+        Returns:
+            numpy.ndarray: A number from 0 to counts[i] - 1 for each entity.
+        """
+        return (self.generator.random(len(counts)) * counts).astype(np.int64)
@@ -17,6 +17,7 @@ class Ghost(Entity):
         name (str): The name of the ghost.
         points (int): The points awarded to Pacman for eating the ghost in Freight mode.
         goal (Vector2): The target position for the ghost.
+        scatterGoal (Vector2): The corner the ghost heads for in Scatter mode.
         directionMethod (function): The method used to determine the ghost's direction.
         mode (ModeController): Manages the ghost's current mode (e.g., Scatter, Chase, Freight).
         homeNode (Node): The node the ghost returns to after being eaten.
@@ -24,7 +25,7 @@ class Ghost(Entity):
         sprites (GhostSprites): The sprite object for the ghost.
     """
 
-    def __init__(self, node, pacman=None, blinky=None):
+    def __init__(self, node, pacman=None, blinky=None, rng=None):
         """
         Initializes a Ghost object.
 
@@ -32,11 +33,13 @@ class Ghost(Entity):
             node (Node): The starting node of the ghost.
             pacman (Pacman): The Pacman object in the game.
             blinky (Blinky): The Blinky ghost object.
+            rng (GameRandom): The random generator of the game.
         """
-        Entity.__init__(self, node)
+        Entity.__init__(self, node, rng)
         self.name = GHOST
         self.points = 200
         self.goal = Vector2()
+        self.scatterGoal = Vector2()
         self.directionMethod = self.goalDirection
         self.pacman = pacman
         self.mode = ModeController(self)
@@ -66,11 +69,39 @@ class Ghost(Entity):
             self.chase()
         Entity.update(self, dt)
 
+    def getState(self):
+        """
+        Gets the state of the ghost that changes during a game, as numbers.
+
+        Returns:
+            list: The state of the entity, then the points, the goal, whether the
+                ghost moves at random and the state of its modes.
+        """
+        return (Entity.getState(self) + [self.points, self.goal.x, self.goal.y,
+                self.directionMethod == self.randomDirection] + self.mode.getState())
+
+    def setState(self, values, start=0):
+        """
+        Puts the ghost back in a state returned by getState.
+
+        Args:
+            values (list): The numbers of the state.
+            start (int): The index of the first number of the ghost in values.
+
+        Returns:
+            int: The index after the last number of the ghost.
+        """
+        start = Entity.setState(self, values, start)
+        self.points = int(values[start])
+        self.goal = Vector2(values[start+1], values[start+2])
+        self.directionMethod = self.randomDirection if values[start+3] else self.goalDirection
+        return self.mode.setState(values, start + 4)
+
     def scatter(self):
         """
         Sets the ghost's target position for the Scatter mode.
         """
-        self.goal = Vector2() 
+        self.goal = self.scatterGoal
 
     def chase(self):
         """
@@ -129,7 +160,7 @@ class Blinky(Ghost):
     The Blinky class does not have separate scatter and chase functions. 
     Instead, it utilizes methods inherited from class Ghosts.
     """
-    def __init__(self, node, pacman=None, blinky=None):
+    def __init__(self, node, pacman=None, blinky=None, rng=None):
         """
         Initializes a Blinky ghost object.
 
@@ -137,8 +168,9 @@ class Blinky(Ghost):
             node (Node): The starting node of the ghost.
             pacman (Pacman): The Pacman object in the game.
             blinky (Blinky): The Blinky ghost object (not used for Blinky itself).
+            rng (GameRandom): The random generator of the game.
         """
-        Ghost.__init__(self, node, pacman, blinky)
+        Ghost.__init__(self, node, pacman, blinky, rng)
         self.name = BLINKY
         self.color = RED
         self.sprites = GhostSprites(self)
@@ -151,7 +183,7 @@ class Pinky(Ghost):
     and aiming for the position four squares ahead of Pacman in the direction Pacman is currently moving.
     In the SCATTER state, Pinky disperses to the top right corner of the maze.
     """
-    def __init__(self, node, pacman=None, blinky=None):
+    def __init__(self, node, pacman=None, blinky=None, rng=None):
         """
         Initializes a Pinky ghost object.
 
@@ -159,23 +191,25 @@ class Pinky(Ghost):
             node (Node): The starting node of the ghost.
             pacman (Pacman): The Pacman object in the game.
             blinky (Blinky): The Blinky ghost object.
+            rng (GameRandom): The random generator of the game.
         """
-        Ghost.__init__(self, node, pacman, blinky)
+        Ghost.__init__(self, node, pacman, blinky, rng)
         self.name = PINKY
         self.color = PINK
+        self.scatterGoal = Vector2(TILEWIDTH*NCOLS, 0)
         self.sprites = GhostSprites(self)
 
     def scatter(self):
         """
         Sets Pinky's target position for the Scatter mode.
         """
-        self.goal = Vector2(TILEWIDTH*NCOLS, 0)
+        self.goal = self.scatterGoal
 
     def chase(self):
         """
         Sets Pinky's target position for the Chase mode.
         """
-        self.goal = self.pacman.position + self.pacman.directions[self.pacman.direction] * TILEWIDTH * 4
+        self.goal = self.pacman.position.copy().iaddScaled(self.pacman.directions[self.pacman.direction], TILEWIDTH * 4)
 
 
 class Inky(Ghost):
@@ -186,7 +220,7 @@ class Inky(Ghost):
     and then multiplying the result by 2.
     In the SCATTER state, Inky disperses to the bottom right corner of the maze.
     """
-    def __init__(self, node, pacman=None, blinky=None):
+    def __init__(self, node, pacman=None, blinky=None, rng=None):
         """
         Initializes an Inky ghost object.
 
@@ -194,25 +228,26 @@ class Inky(Ghost):
             node (Node): The starting node of the ghost.
             pacman (Pacman): The Pacman object in the game.
             blinky (Blinky): The Blinky ghost object, used for Inky's chasing behavior.
+            rng (GameRandom): The random generator of the game.
         """
-        Ghost.__init__(self, node, pacman, blinky)
+        Ghost.__init__(self, node, pacman, blinky, rng)
         self.name = INKY
         self.color = TEAL
+        self.scatterGoal = Vector2(TILEWIDTH*NCOLS, TILEHEIGHT*NROWS)
         self.sprites = GhostSprites(self)
 
     def scatter(self):
         """
         Sets Inky's target position for the Scatter mode.
         """
-        self.goal = Vector2(TILEWIDTH*NCOLS, TILEHEIGHT*NROWS)
+        self.goal = self.scatterGoal
 
     def chase(self):
         """
         Sets Inky's target position for the Chase mode.
         """
-        vec1 = self.pacman.position + self.pacman.directions[self.pacman.direction] * TILEWIDTH * 2
-        vec2 = (vec1 - self.blinky.position) * 2
-        self.goal = self.blinky.position + vec2
+        self.goal = self.pacman.position.copy().iaddScaled(self.pacman.directions[self.pacman.direction], TILEWIDTH * 2)
+        self.goal.isub(self.blinky.position).imul(2).iadd(self.blinky.position)
 
 
 class Clyde(Ghost):
@@ -223,7 +258,7 @@ class Clyde(Ghost):
     When Clyde is farther away from Pacman, he adopts a similar pursuit strategy to Pinky.
     In the SCATTER state, Clyde disperses to the bottom left corner of the maze.
     """
-    def __init__(self, node, pacman=None, blinky=None):
+    def __init__(self, node, pacman=None, blinky=None, rng=None):
         """
         Initializes a Clyde ghost object.
 
@@ -231,46 +266,48 @@ class Clyde(Ghost):
             node (Node): The starting node of the ghost.
             pacman (Pacman): The Pacman object in the game.
             blinky (Blinky): The Blinky ghost object.
+            rng (GameRandom): The random generator of the game.
         """
-        Ghost.__init__(self, node, pacman, blinky)
+        Ghost.__init__(self, node, pacman, blinky, rng)
         self.name = CLYDE
         self.color = ORANGE
+        self.scatterGoal = Vector2(0, TILEHEIGHT*NROWS)
         self.sprites = GhostSprites(self)
 
     def scatter(self):
         """
         Sets Clyde's target position for the Scatter mode.
         """
-        self.goal = Vector2(0, TILEHEIGHT*NROWS)
+        self.goal = self.scatterGoal
 
     def chase(self):
         """
         Sets Clyde's target position for the Chase mode, based on distance from Pacman.
         """
-        d = self.pacman.position - self.position
-        ds = d.magnitudeSquared()
+        ds = self.pacman.position.distanceSquared(self.position)
         if ds <= (TILEWIDTH * 8)**2:
             self.scatter()
         else:
-            self.goal = self.pacman.position + self.pacman.directions[self.pacman.direction] * TILEWIDTH * 4
+            self.goal = self.pacman.position.copy().iaddScaled(self.pacman.directions[self.pacman.direction], TILEWIDTH * 4)
 
 
 class GhostGroup(object):
     """
     Manages a group of ghost objects.
     """
-    def __init__(self, node, pacman):
+    def __init__(self, node, pacman, rng=None):
         """
         Initializes a GhostGroup object.
 
         Args:
             node (Node): The starting node for all ghosts in the group.
             pacman (Pacman): The Pacman object in the game.
+            rng (GameRandom): The random generator of the game, shared by the ghosts.
         """
-        self.blinky = Blinky(node, pacman)
-        self.pinky = Pinky(node, pacman)
-        self.inky = Inky(node, pacman, self.blinky)
-        self.clyde = Clyde(node, pacman)
+        self.blinky = Blinky(node, pacman, rng=rng)
+        self.pinky = Pinky(node, pacman, rng=rng)
+        self.inky = Inky(node, pacman, self.blinky, rng)
+        self.clyde = Clyde(node, pacman, rng=rng)
         self.ghosts = [self.blinky, self.pinky, self.inky, self.clyde]
 
     def __iter__(self):
@@ -0,0 +1,245 @@
+import os
+import hashlib
+import tempfile
+import numpy as np
+
+MAZECACHE = "Pacman_NgThienBao/cache"
+VERSION = 1
+NODESYMBOLS = ['+', 'P', 'n']
+PATHSYMBOLS = ['.', '-', '|', 'p']
+PELLETSYMBOLS = ['.', '+']
+POWERPELLETSYMBOLS = ['P', 'p']
+
+compiled = {}
+
+def readMazeFile(textfile):
+    """Reads in a maze text file using numpy's loadtxt.
+
+    Args:
+        textfile (str): The path of the text file.
+
+    Returns:
+        numpy.ndarray: The characters of the maze, one per cell.
+    """
+    return np.loadtxt(textfile, dtype='<U1')
+
+
+def findNodes(data, nodeSymbols=NODESYMBOLS):
+    """Finds the node cells of a maze, row by row.
+
+    Args:
+        data (numpy.ndarray): The characters of the maze.
+        nodeSymbols (list): The characters representing nodes.
+
+    Returns:
+        numpy.ndarray: The (N, 2) col, row of every node.
+    """
+    rows, cols = np.nonzero(np.isin(data, nodeSymbols))
+    return np.column_stack((cols, rows))
+
+
+def findLinks(data, nodeSymbols=NODESYMBOLS, pathSymbols=PATHSYMBOLS):
+    """Finds the pairs of nodes joined by a path along each row of a maze.
+    Pass the transposed maze to find the links along the columns.
+
+    Two nodes are linked when they are next to each other in a row and every
+    cell between them is a path. The cells that are neither nodes nor paths
+    are counted along each row, so a pair is linked when the count is the same
+    on both sides of the gap.
+
+    Args:
+        data (numpy.ndarray): The characters of the maze.
+        nodeSymbols (list): The characters representing nodes.
+        pathSymbols (list): The characters representing paths.
+
+    Returns:
+        tuple: The (L, 2) col, row of the left node and of the right node of every link.
+    """
+    nodemask = np.isin(data, nodeSymbols)
+    blocked = np.cumsum(~(nodemask | np.isin(data, pathSymbols)), axis=1)
+    rows, cols = np.nonzero(nodemask)
+    pairs = np.nonzero(rows[1:] == rows[:-1])[0]
+    rows, starts, ends = rows[pairs], cols[pairs], cols[pairs + 1]
+    linked = blocked[rows, ends] == blocked[rows, starts]
+    rows, starts, ends = rows[linked], starts[linked], ends[linked]
+    return np.column_stack((starts, rows)), np.column_stack((ends, rows))
+
+
+def findPellets(data):
+    """Finds the pellets of a maze, row by row.
+
+    Args:
+        data (numpy.ndarray): The characters of the maze.
+
+    Returns:
+        numpy.ndarray: The (P, 3) col, row and power of every pellet, power being 1 for power pellets.
+    """
+    power = np.isin(data, POWERPELLETSYMBOLS)
+    rows, cols = np.nonzero(power | np.isin(data, PELLETSYMBOLS))
+    return np.column_stack((cols, rows, power[rows, cols]))
+
+
+def findTiles(data, rotdata):
+    """Finds the wall tiles of a maze and the spritesheet image of each.
+
+    Args:
+        data (numpy.ndarray): The characters of the maze.
+        rotdata (numpy.ndarray or None): The rotation of each cell in quarter turns.
+
+    Returns:
+        numpy.ndarray: The (T, 5) col, row, x, y and rotation of every tile, x and y
+            being the spritesheet position. y is -1 for tiles drawn in the level's colour row.
+    """
+    digits = np.char.isdigit(data)
+    rows, cols = np.nonzero(digits | (data == '='))
+    tiles = np.zeros((len(rows), 5), dtype=np.int32)
+    tiles[:, 0] = cols
+    tiles[:, 1] = rows
+    tiles[:, 2:4] = (10, 8)
+    isdigit = digits[rows, cols]
+    tiles[isdigit, 2] = data[rows[isdigit], cols[isdigit]].astype(np.int32) + 12
+    tiles[isdigit, 3] = -1
+    if rotdata is not None:
+        tiles[isdigit, 4] = rotdata[rows[isdigit], cols[isdigit]].astype(np.int32)
+    return tiles
+
+
+class CompiledMaze(object):
+    """A class holding everything a level needs from a maze file, in arrays.
+
+    The arrays are views into one int32 array, which is what gets saved to disk:
+    a header (version, rows, cols, number of nodes, pellets and tiles) followed
+    by the nodes, neighbors, pellets and tiles.
+
+    Attributes:
+        digest (str): The hash of the maze and rotation files the maze was compiled from.
+        shape (tuple): The number of rows and columns of the maze.
+        nodes (numpy.ndarray): The (N, 2) col, row of the nodes.
+        neighbors (numpy.ndarray): The (N, 4) ids of the UP, DOWN, LEFT and RIGHT neighbors, -1 for none.
+        pellets (numpy.ndarray): The (P, 3) col, row and power flag of the pellets.
+        tiles (numpy.ndarray): The (T, 5) col, row, spritesheet x, y and rotation of the wall tiles.
+    """
+
+    def __init__(self, buffer, digest):
+        """Initialize the CompiledMaze object.
+
+        Args:
+            buffer (numpy.ndarray): The flat int32 array holding the compiled maze.
+            digest (str): The hash of the maze and rotation files.
+        """
+        self.buffer = buffer
+        self.digest = digest
+        rows, cols, n, p, t = [int(value) for value in buffer[1:6]]
+        self.shape = (rows, cols)
+        start = 6
+        self.nodes = buffer[start:start + 2*n].reshape(n, 2)
+        start += 2*n
+        self.neighbors = buffer[start:start + 4*n].reshape(n, 4)
+        start += 4*n
+        self.pellets = buffer[start:start + 3*p].reshape(p, 3)
+        start += 3*p
+        self.tiles = buffer[start:start + 5*t].reshape(t, 5)
+
+
+def compileMaze(mazefile, rotfile=None):
+    """Parses a maze and its rotation file into the flat array of a CompiledMaze.
+
+    Args:
+        mazefile (str): The path of the maze text file.
+        rotfile (str): The path of the rotation text file, or None.
+
+    Returns:
+        numpy.ndarray: The flat int32 array.
+    """
+    data = readMazeFile(mazefile)
+    rotdata = readMazeFile(rotfile) if rotfile is not None else None
+    nodes = findNodes(data)
+    ids = np.full(data.shape, -1, dtype=np.int32)
+    ids[nodes[:, 1], nodes[:, 0]] = np.arange(len(nodes))
+    neighbors = np.full((len(nodes), 4), -1, dtype=np.int32)
+    starts, ends = findLinks(data)
+    starts, ends = ids[starts[:, 1], starts[:, 0]], ids[ends[:, 1], ends[:, 0]]
+    neighbors[starts, 3] = ends
+    neighbors[ends, 2] = starts
+    starts, ends = findLinks(data.transpose())
+    starts, ends = ids[starts[:, 0], starts[:, 1]], ids[ends[:, 0], ends[:, 1]]
+    neighbors[starts, 1] = ends
+    neighbors[ends, 0] = starts
+    pellets = findPellets(data)
+    tiles = findTiles(data, rotdata)
+    header = [VERSION, data.shape[0], data.shape[1], len(nodes), len(pellets), len(tiles)]
+    parts = [np.array(header, dtype=np.int32),
+             nodes.astype(np.int32).reshape(-1),
+             neighbors.reshape(-1),
+             pellets.astype(np.int32).reshape(-1),
+             tiles.reshape(-1)]
+    return np.concatenate(parts)
+
+
+def writeCacheFile(path, write):
+    """Writes a cache file so that other processes never see it half written.
+    The data goes to a temporary file in the same folder, which then replaces
+    the file at path in one step. Cache files are named by the hash of what they
+    hold, so if another process holds the file open and it can't be replaced,
+    the copy already there is kept.
+
+    Args:
+        path (str): The path of the cache file.
+        write (function): Called with the open temporary file to write the data into.
+    """
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    handle, temp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            write(f)
+        os.replace(temp, path)
+    except OSError:
+        if not os.path.exists(path):
+            raise
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+
+
+def loadMaze(mazefile, rotfile=None, cachedir=MAZECACHE):
+    """Gets the compiled form of a maze, compiling it only if its contents are new.
+
+    Compiled mazes are kept in memory and saved to the cache folder named by a
+    hash of the maze and rotation files, so they are parsed once and later
+    loaded with a single memory-mapped read. A cache file that can't be read
+    is compiled again, as if it were missing.
+
+    Args:
+        mazefile (str): The path of the maze text file.
+        rotfile (str): The path of the rotation text file. Defaults to the
+            mazeN_rotation.txt next to the maze file, if there is one.
+        cachedir (str): The folder for compiled mazes, or None to keep them in memory only.
+
+    Returns:
+        CompiledMaze: The compiled maze.
+    """
+    if rotfile is None:
+        rotfile = mazefile[:-4] + "_rotation.txt"
+        if not os.path.exists(rotfile):
+            rotfile = None
+    digest = hashlib.sha1(str(VERSION).encode())
+    for path in [mazefile, rotfile]:
+        if path is not None:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    digest = digest.hexdigest()
+    if digest not in compiled:
+        path = None if cachedir is None else os.path.join(cachedir, "maze_" + digest + ".npy")
+        buffer = None
+        if path is not None and os.path.exists(path):
+            try:
+                buffer = np.asarray(np.load(path, mmap_mode='r'))
+            except (OSError, ValueError, EOFError):
+                buffer = None  # A damaged cache file is compiled again
+        if buffer is None:
+            buffer = compileMaze(mazefile, rotfile)
+            if path is not None:
+                writeCacheFile(path, lambda f: np.save(f, buffer))
+        compiled[digest] = CompiledMaze(buffer, digest)
+    return compiled[digest]
@@ -77,6 +77,34 @@ class ModeController(object):
                 self.entity.normalMode()
                 self.current = self.mainmode.mode
 
+    def getState(self):
+        """Gets the modes and timers as numbers.
+
+        Returns:
+            list: The current mode, the Freight timer and its length (-1 for none),
+                then the main mode, its timer and its length.
+        """
+        return [self.current, self.timer, -1 if self.time is None else self.time,
+                self.mainmode.mode, self.mainmode.timer, self.mainmode.time]
+
+    def setState(self, values, start=0):
+        """Puts the modes back in a state returned by getState.
+
+        Args:
+            values (list): The numbers of the state.
+            start (int): The index of the first number of the modes in values.
+
+        Returns:
+            int: The index after the last number of the modes.
+        """
+        self.current = int(values[start])
+        self.timer = values[start+1]
+        self.time = None if values[start+2] < 0 else values[start+2]
+        self.mainmode.mode = int(values[start+3])
+        self.mainmode.timer = values[start+4]
+        self.mainmode.time = values[start+5]
+        return start + 6
+
     def setFreightMode(self):
         """Sets the mode to freight mode."""
         if self.current in [SCATTER, CHASE]:
@@ -1,39 +1,176 @@
 import pygame
+import os
+import heapq
+import zipfile
+import hashlib
 from vector import Vector2
 from constants import *
+from mazecompiler import loadMaze, findNodes, findLinks, writeCacheFile
 import numpy as np
 
+PATHCACHE = "Pacman_NgThienBao/cache"
+PATHNAMES = (PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT)
+# Đồ thị lớn hơn thì dùng Dijkstra từng hàng thay vì bảng đầy đủ
+MAXPATHTABLE = 1024
+
 # X: empty space
 # +: node
 # .: horizontal/vertical path
 
+ALLACCESS = (1 << PACMAN) | (1 << BLINKY) | (1 << PINKY) | (1 << INKY) | (1 << CLYDE) | (1 << FRUIT)
+
+class NodeNeighbors(object):
+    """
+    A dictionary-like view of one row of the neighbor array of a NodeGroup.
+    Keys are directions (UP, DOWN, LEFT, RIGHT, PORTAL) and values are Node objects or None.
+    """
+    __slots__ = ('group', 'id')
+
+    def __init__(self, group, id):
+        """
+        Initializes a new NodeNeighbors view.
+
+        Args:
+            group (NodeGroup): The group holding the neighbor array.
+            id (int): The id of the node.
+        """
+        self.group = group
+        self.id = id
+
+    def __getitem__(self, direction):
+        """
+        Returns the neighbor in a direction, or None if there is none.
+        """
+        other = self.group.neighborIds[self.id, DIRECTIONINDEX[direction]]
+        if other < 0:
+            return None
+        return self.group.getNode(other)
+
+    def __setitem__(self, direction, node):
+        """
+        Sets the neighbor in a direction.
+        """
+        self.group.neighborIds[self.id, DIRECTIONINDEX[direction]] = -1 if node is None else node.id
+        self.group.edgeLengths = None
+        self.group.invalidateTables()
+
+    def keys(self):
+        """
+        Returns the directions a node can have neighbors in.
+        """
+        return list(DIRECTIONINDEX.keys())
+
+
+class NodeAccessList(object):
+    """
+    A list-like view of the entities allowed to leave a node in one direction,
+    stored as a bitmask with one bit per entity name.
+    """
+    __slots__ = ('group', 'id', 'index')
+
+    def __init__(self, group, id, index):
+        """
+        Initializes a new NodeAccessList view.
+
+        Args:
+            group (NodeGroup): The group holding the access array.
+            id (int): The id of the node.
+            index (int): The column of the direction in the access array.
+        """
+        self.group = group
+        self.id = id
+        self.index = index
+
+    def __contains__(self, name):
+        """
+        Checks if an entity name is allowed.
+        """
+        return (self.group.accessMasks[self.id, self.index] >> name) & 1 == 1
+
+    def __iter__(self):
+        """
+        Iterates over the allowed entity names.
+        """
+        mask = int(self.group.accessMasks[self.id, self.index])
+        return iter([name for name in range(mask.bit_length()) if (mask >> name) & 1])
+
+    def append(self, name):
+        """
+        Allows an entity name.
+        """
+        self.group.updateAccess(self.id, MOVEDIRECTIONS[self.index], 1 << name, 0)
+
+    def remove(self, name):
+        """
+        Denies an entity name.
+        """
+        self.group.updateAccess(self.id, MOVEDIRECTIONS[self.index], 0, 1 << name)
+
+
+class NodeAccess(object):
+    """
+    A dictionary-like view of one row of the access array of a NodeGroup.
+    Keys are directions (UP, DOWN, LEFT, RIGHT) and values are NodeAccessList views.
+    """
+    __slots__ = ('group', 'id')
+
+    def __init__(self, group, id):
+        """
+        Initializes a new NodeAccess view.
+
+        Args:
+            group (NodeGroup): The group holding the access array.
+            id (int): The id of the node.
+        """
+        self.group = group
+        self.id = id
+
+    def __getitem__(self, direction):
+        """
+        Returns the entities allowed to leave the node in a direction.
+        """
+        return NodeAccessList(self.group, self.id, DIRECTIONINDEX[direction])
+
+    def keys(self):
+        """
+        Returns the directions with access rules.
+        """
+        return [UP, DOWN, LEFT, RIGHT]
+
+
 class Node(object):
     """
     The Node class will contain information about the node's position, 
     neighboring nodes, and entity access.
+    The data lives in the arrays of the NodeGroup and a Node is a thin view of one row.
 
     Attributes:
+        group (NodeGroup): The group holding the node arrays.
+        id (int): The index of the node in the arrays of its NodeGroup.
         position (Vector2): The position of the node on the screen.
-        neighbors (dict): A dictionary storing the neighboring nodes of the current node.
+        neighbors (NodeNeighbors): The neighboring nodes of the current node.
         Keys are directions (UP, DOWN, LEFT, RIGHT, PORTAL) and values are Node objects.
-        access (dict): A dictionary storing the entity access to the current node.
-        Keys are directions (UP, DOWN, LEFT, RIGHT) and values are lists of entities allowed to access.
+        access (NodeAccess): The entity access to the current node.
+        Keys are directions (UP, DOWN, LEFT, RIGHT) and values are NodeAccessList views of the entities allowed to access.
         ...
     """
-    def __init__(self, x, y):
+    __slots__ = ('group', 'id', 'position', 'neighbors', 'access')
+
+    def __init__(self, group, id, x, y):
         """
         Initializes a new Node object.
 
         Args:
+            group (NodeGroup): The group holding the node arrays.
+            id (int): The index of the node in the arrays.
             x (int): The x-coordinate of the node.
             y (int): The y-coordinate of the node.
         """
+        self.group = group
+        self.id = id
         self.position = Vector2(x, y)
-        self.neighbors = {UP:None, DOWN:None, LEFT:None, RIGHT:None, PORTAL:None}
-        self.access = {UP:[PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT], 
-                       DOWN:[PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT], 
-                       LEFT:[PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT], 
-                       RIGHT:[PACMAN, BLINKY, PINKY, INKY, CLYDE, FRUIT]}
+        self.neighbors = NodeNeighbors(group, id)
+        self.access = NodeAccess(group, id)
 
     def denyAccess(self, direction, entity):
         """
@@ -43,8 +180,7 @@ class Node(object):
             direction (int): The direction to deny access.
             entity (Entity): The entity to deny access.
         """
-        if entity.name in self.access[direction]:
-            self.access[direction].remove(entity.name)
+        self.group.updateAccess(self.id, direction, 0, 1 << entity.name)
 
     def allowAccess(self, direction, entity):
         """
@@ -54,8 +190,7 @@ class Node(object):
             direction (int): The direction to allow access.
             entity (Entity): The entity to allow access.
         """
-        if entity.name not in self.access[direction]:
-            self.access[direction].append(entity.name)
+        self.group.updateAccess(self.id, direction, 1 << entity.name, 0)
     
     def render(self, screen):
         """
@@ -78,10 +213,23 @@ class NodeGroup(object):
     Attributes:
         level (str): The name of the text file containing level information.
         nodesLUT (dict): A dictionary storing all nodes in the level.
-            Keys are the pixel coordinates of the node and values are Node objects.
+            Keys are the pixel coordinates of the node and values are node ids.
         nodeSymbols (list): A list of characters in the text file representing nodes.
         pathSymbols (list): A list of characters in the text file representing paths.
         homekey (tuple): The pixel coordinates of the home node.
+        numNodes (int): The number of nodes in the arrays.
+        positions (numpy.ndarray): The (N, 2) pixel positions of the nodes.
+        neighborIds (numpy.ndarray): The (N, 5) ids of the UP, DOWN, LEFT, RIGHT and PORTAL neighbors, -1 for none.
+        accessMasks (numpy.ndarray): The (N, 4) bitmasks of the entity names allowed to leave in each direction.
+        nodeList (list): The Node views in id order, None for views not yet created.
+        validTables (dict): The valid-direction tables of each entity name, cleared when access or neighbors change.
+        edgeLengths (tuple): The lengths of the edges leaving each node, None until built or after the neighbors change.
+        pathGraphs (dict): The moves each entity name may make from every node, for the path searches.
+        pathRows (dict): The shortest paths from one node, keyed by (name, id), for graphs too large for the tables.
+        pathNames (dict): The row of each entity name in the path tables.
+        pathDistances (numpy.ndarray): The (names, N, N) shortest path lengths in pixels, None until computePaths runs.
+        pathDirections (numpy.ndarray): The (names, N, N) first direction to take on each shortest path.
+            The graphs, rows and tables are all cleared when access or neighbors change.
     """
     def __init__(self, level):
         """
@@ -92,25 +240,29 @@ class NodeGroup(object):
         """
         self.level = level
         self.nodesLUT = {}
+        self.numNodes = 0
+        self.positions = np.zeros((64, 2), dtype=np.int32)
+        self.neighborIds = np.full((64, 5), -1, dtype=np.int32)
+        self.accessMasks = np.zeros((64, 4), dtype=np.int32)
+        self.nodeList = []
         self.nodeSymbols = ['+', 'P', 'n']
         self.pathSymbols = ['.', '-', '|', 'p']
-        data = self.readMazeFile(level)
-        self.createNodeTable(data)
-        self.connectHorizontally(data)
-        self.connectVertically(data)
+        self.createNodesFromMaze(loadMaze(level))
         self.homekey = None
+        self.edgeLengths = None
+        self.invalidateTables()
 
-    def readMazeFile(self, textfile):
+    def createNodesFromMaze(self, maze):
         """
-        Reads in the text file using numpy's loadtxt.
+        Creates the nodes and their connections from a compiled maze.
 
         Args:
-            textfile (str): The name of the text file containing level information.
-
-        Returns:
-            numpy.ndarray: A numpy array containing data from the text file.
+            maze (CompiledMaze): The compiled maze of the level.
         """
-        return np.loadtxt(textfile, dtype='<U1')
+        start = self.addNodes(maze.nodes * (TILEWIDTH, TILEHEIGHT))
+        neighbors = maze.neighbors + start
+        neighbors[maze.neighbors < 0] = -1
+        self.neighborIds[start:self.numNodes, :4] = neighbors
 
     def createNodeTable(self, data, xoffset=0, yoffset=0):
         """
@@ -121,11 +273,97 @@ class NodeGroup(object):
             xoffset (int): The horizontal offset of the node table from pixel coordinates.
             yoffset (int): The vertical offset of the node table from pixel coordinates.
         """
-        for row in list(range(data.shape[0])):
-            for col in list(range(data.shape[1])):
-                if data[row][col] in self.nodeSymbols:
-                    x, y = self.constructKey(col+xoffset, row+yoffset)
-                    self.nodesLUT[(x, y)] = Node(x, y)
+        self.addNodes((findNodes(data, self.nodeSymbols) + (xoffset, yoffset)) * (TILEWIDTH, TILEHEIGHT))
+
+    def reserveNodes(self, count):
+        """
+        Makes room for more nodes, doubling the size of the arrays until they fit.
+
+        Args:
+            count (int): The number of nodes about to be added.
+        """
+        size = len(self.positions)
+        while self.numNodes + count > size:
+            size *= 2
+        if size > len(self.positions):
+            self.positions = np.resize(self.positions, (size, 2))
+            self.neighborIds = np.concatenate([self.neighborIds, np.full((size - len(self.neighborIds), 5), -1, dtype=np.int32)])
+            self.accessMasks = np.resize(self.accessMasks, (size, 4))
+
+    def addNode(self, x, y):
+        """
+        Adds a node to the arrays, doubling their size when they are full.
+
+        Args:
+            x (int): The x-coordinate of the node.
+            y (int): The y-coordinate of the node.
+
+        Returns:
+            Node: The view of the new node.
+        """
+        self.reserveNodes(1)
+        id = self.numNodes
+        self.positions[id] = (x, y)
+        self.neighborIds[id] = -1
+        self.accessMasks[id] = ALLACCESS
+        self.numNodes += 1
+        self.nodeList.append(None)
+        return self.getNode(id)
+
+    def addNodes(self, keys):
+        """
+        Adds many nodes to the arrays and the lookup table at once.
+
+        Args:
+            keys (numpy.ndarray): The (K, 2) pixel coordinates of the nodes.
+
+        Returns:
+            int: The id of the first new node.
+        """
+        start = self.numNodes
+        self.reserveNodes(len(keys))
+        self.numNodes += len(keys)
+        self.positions[start:self.numNodes] = keys
+        self.neighborIds[start:self.numNodes] = -1
+        self.accessMasks[start:self.numNodes] = ALLACCESS
+        self.nodeList.extend([None] * len(keys))
+        self.nodesLUT.update(zip(map(tuple, keys.tolist()), range(start, self.numNodes)))
+        return start
+
+    def getNode(self, id):
+        """
+        Returns the view of a node, creating it the first time it is needed so
+        that large mazes do not pay for views of nodes no entity visits.
+
+        Args:
+            id (int): The id of the node.
+
+        Returns:
+            Node: The view of the node.
+        """
+        node = self.nodeList[id]
+        if node is None:
+            x, y = self.positions[id].tolist()
+            node = self.nodeList[id] = Node(self, id, x, y)
+        return node
+
+    def getNodeIds(self, data, xoffset=0, yoffset=0):
+        """
+        Looks up the ids of the nodes in the cells of the text file data.
+
+        Args:
+            data (numpy.ndarray): A numpy array containing data from the text file.
+            xoffset (int): The horizontal offset of the node table from pixel coordinates.
+            yoffset (int): The vertical offset of the node table from pixel coordinates.
+
+        Returns:
+            numpy.ndarray: The node id of each cell, -1 for cells without a node.
+        """
+        ids = np.full(data.shape, -1, dtype=np.int32)
+        cells = findNodes(data, self.nodeSymbols)
+        keys = ((cells + (xoffset, yoffset)) * (TILEWIDTH, TILEHEIGHT)).tolist()
+        ids[cells[:, 1], cells[:, 0]] = [self.nodesLUT[tuple(key)] for key in keys]
+        return ids
 
     def constructKey(self, x, y):
         """
@@ -149,19 +387,13 @@ class NodeGroup(object):
             xoffset (int): The horizontal offset of the node table from pixel coordinates.
             yoffset (int): The vertical offset of the node table from pixel coordinates.
         """
-        for row in list(range(data.shape[0])):
-            key = None
-            for col in list(range(data.shape[1])):
-                if data[row][col] in self.nodeSymbols:
-                    if key is None:
-                        key = self.constructKey(col+xoffset, row+yoffset)
-                    else:
-                        otherkey = self.constructKey(col+xoffset, row+yoffset)
-                        self.nodesLUT[key].neighbors[RIGHT] = self.nodesLUT[otherkey]
-                        self.nodesLUT[otherkey].neighbors[LEFT] = self.nodesLUT[key]
-                        key = otherkey
-                elif data[row][col] not in self.pathSymbols:
-                    key = None
+        ids = self.getNodeIds(data, xoffset, yoffset)
+        starts, ends = findLinks(data, self.nodeSymbols, self.pathSymbols)
+        starts, ends = ids[starts[:, 1], starts[:, 0]], ids[ends[:, 1], ends[:, 0]]
+        self.neighborIds[starts, DIRECTIONINDEX[RIGHT]] = ends
+        self.neighborIds[ends, DIRECTIONINDEX[LEFT]] = starts
+        self.edgeLengths = None
+        self.invalidateTables()
 
     def connectVertically(self, data, xoffset=0, yoffset=0):
         """
@@ -172,20 +404,13 @@ class NodeGroup(object):
             xoffset (int): The horizontal offset of the node table from pixel coordinates.
             yoffset (int): The vertical offset of the node table from pixel coordinates.
         """
-        dataT = data.transpose()
-        for col in list(range(dataT.shape[0])):
-            key = None
-            for row in list(range(dataT.shape[1])):
-                if dataT[col][row] in self.nodeSymbols:
-                    if key is None:
-                        key = self.constructKey(col+xoffset, row+yoffset)
-                    else:
-                        otherkey = self.constructKey(col+xoffset, row+yoffset)
-                        self.nodesLUT[key].neighbors[DOWN] = self.nodesLUT[otherkey]
-                        self.nodesLUT[otherkey].neighbors[UP] = self.nodesLUT[key]
-                        key = otherkey
-                elif dataT[col][row] not in self.pathSymbols:
-                    key = None
+        ids = self.getNodeIds(data, xoffset, yoffset)
+        starts, ends = findLinks(data.transpose(), self.nodeSymbols, self.pathSymbols)
+        starts, ends = ids[starts[:, 0], starts[:, 1]], ids[ends[:, 0], ends[:, 1]]
+        self.neighborIds[starts, DIRECTIONINDEX[DOWN]] = ends
+        self.neighborIds[ends, DIRECTIONINDEX[UP]] = starts
+        self.edgeLengths = None
+        self.invalidateTables()
 
     def getStartTempNode(self):
         """
@@ -195,7 +420,7 @@ class NodeGroup(object):
             Node: The node where Pacman starts.
         """
         nodes = list(self.nodesLUT.values())
-        return nodes[0]
+        return self.getNode(nodes[0])
 
     def setPortalPair(self, pair1, pair2):
         """
@@ -208,8 +433,8 @@ class NodeGroup(object):
         key1 = self.constructKey(*pair1)
         key2 = self.constructKey(*pair2)
         if key1 in self.nodesLUT.keys() and key2 in self.nodesLUT.keys():
-            self.nodesLUT[key1].neighbors[PORTAL] = self.nodesLUT[key2]
-            self.nodesLUT[key2].neighbors[PORTAL] = self.nodesLUT[key1]
+            self.getNode(self.nodesLUT[key1]).neighbors[PORTAL] = self.getNode(self.nodesLUT[key2])
+            self.getNode(self.nodesLUT[key2]).neighbors[PORTAL] = self.getNode(self.nodesLUT[key1])
 
     def createHomeNodes(self, xoffset, yoffset):
         """
@@ -244,8 +469,8 @@ class NodeGroup(object):
             direction (int): The direction of the connection.
         """
         key = self.constructKey(*otherkey)
-        self.nodesLUT[homekey].neighbors[direction] = self.nodesLUT[key]
-        self.nodesLUT[key].neighbors[direction*-1] = self.nodesLUT[homekey]
+        self.getNode(self.nodesLUT[homekey]).neighbors[direction] = self.getNode(self.nodesLUT[key])
+        self.getNode(self.nodesLUT[key]).neighbors[direction*-1] = self.getNode(self.nodesLUT[homekey])
 
     def getNodeFromPixels(self, xpixel, ypixel):
         """
@@ -259,7 +484,7 @@ class NodeGroup(object):
             Node: The node corresponding to the given pixel coordinates.
         """
         if (xpixel, ypixel) in self.nodesLUT.keys():
-            return self.nodesLUT[(xpixel, ypixel)]
+            return self.getNode(self.nodesLUT[(xpixel, ypixel)])
         return None
     
     def getNodeFromTiles(self, col, row):
@@ -275,7 +500,7 @@ class NodeGroup(object):
         """
         x, y = self.constructKey(col, row)
         if (x, y) in self.nodesLUT.keys():
-            return self.nodesLUT[(x, y)]
+            return self.getNode(self.nodesLUT[(x, y)])
         return None
 
     def denyAccess(self, col, row, direction, entity):
@@ -316,8 +541,9 @@ class NodeGroup(object):
             direction (int): The direction to deny access.
             entities (list): The list of entities to deny access.
         """
-        for entity in entities:
-            self.denyAccess(col, row, direction, entity)
+        node = self.getNodeFromTiles(col, row)
+        if node is not None:
+            self.updateAccess(node.id, direction, 0, self.getNameMask(entities))
 
     def allowAccessList(self, col, row, direction, entities):
         """
@@ -329,8 +555,9 @@ class NodeGroup(object):
             direction (int): The direction to allow access.
             entities (list): The list of entities to allow access.
         """
-        for entity in entities:
-            self.allowAccess(col, row, direction, entity)
+        node = self.getNodeFromTiles(col, row)
+        if node is not None:
+            self.updateAccess(node.id, direction, self.getNameMask(entities), 0)
 
     def denyHomeAccess(self, entity):
         """
@@ -339,7 +566,7 @@ class NodeGroup(object):
         Args:
             entity (Entity): The entity to deny access.
         """
-        self.nodesLUT[self.homekey].denyAccess(DOWN, entity)
+        self.getNode(self.nodesLUT[self.homekey]).denyAccess(DOWN, entity)
 
     def allowHomeAccess(self, entity):
         """
@@ -348,7 +575,7 @@ class NodeGroup(object):
         Args:
             entity (Entity): The entity to allow access.
         """
-        self.nodesLUT[self.homekey].allowAccess(DOWN, entity)
+        self.getNode(self.nodesLUT[self.homekey]).allowAccess(DOWN, entity)
 
     def denyHomeAccessList(self, entities):
         """
@@ -357,8 +584,7 @@ class NodeGroup(object):
         Args:
             entities (list): The list of entities to deny access.
         """
-        for entity in entities:
-            self.denyHomeAccess(entity)
+        self.updateAccess(self.nodesLUT[self.homekey], DOWN, 0, self.getNameMask(entities))
 
     def allowHomeAccessList(self, entities):
         """
@@ -367,8 +593,304 @@ class NodeGroup(object):
         Args:
             entities (list): The list of entities to allow access.
         """
+        self.updateAccess(self.nodesLUT[self.homekey], DOWN, self.getNameMask(entities), 0)
+
+    def getNameMask(self, entities):
+        """
+        Combines the access bits of a list of entities.
+
+        Args:
+            entities (list): The entities.
+
+        Returns:
+            int: The bitmask with the bit of each entity name set.
+        """
+        mask = 0
         for entity in entities:
-            self.allowHomeAccess(entity)
+            mask |= 1 << entity.name
+        return mask
+
+    def updateAccess(self, id, direction, allow, deny):
+        """
+        Allows and denies entity names in one direction of a node.
+        The valid-direction tables are cleared only if the access rules change.
+
+        Args:
+            id (int): The id of the node.
+            direction (int): The direction to update.
+            allow (int): The bitmask of entity names to allow.
+            deny (int): The bitmask of entity names to deny.
+        """
+        index = DIRECTIONINDEX[direction]
+        old = int(self.accessMasks[id, index])
+        new = (old | allow) & ~deny
+        if new != old:
+            self.accessMasks[id, index] = new
+            self.invalidateTables()
+
+    def getAccessState(self):
+        """
+        Returns a copy of the access rules, which change as the game runs.
+
+        Returns:
+            numpy.ndarray: The (numNodes, 4) access bitmasks.
+        """
+        return self.accessMasks[:self.numNodes].copy()
+
+    def setAccessState(self, masks):
+        """
+        Puts back access rules returned by getAccessState.
+        The valid-direction tables are cleared only if the rules change.
+
+        Args:
+            masks (numpy.ndarray): The (numNodes, 4) access bitmasks.
+        """
+        if not np.array_equal(self.accessMasks[:self.numNodes], masks):
+            self.accessMasks[:self.numNodes] = masks
+            self.invalidateTables()
+
+    def getValidTable(self, name):
+        """
+        Returns the directions an entity may move in from every node,
+        building the table on first use after the access rules change.
+
+        Args:
+            name (int): The name of the entity.
+
+        Returns:
+            tuple: A list of direction bitmasks (bit i for MOVEDIRECTIONS[i]) and
+                a list of direction tuples, both indexed by node id.
+        """
+        if name not in self.validTables:
+            n = self.numNodes
+            valid = ((self.accessMasks[:n] >> name) & 1 == 1) & (self.neighborIds[:n, :4] >= 0)
+            masks = (valid * np.array([1, 2, 4, 8])).sum(axis=1).tolist()
+            directions = [tuple(d for d, ok in zip(MOVEDIRECTIONS, row) if ok) for row in valid.tolist()]
+            self.validTables[name] = (masks, directions)
+        return self.validTables[name]
+
+    def getEdgeLengths(self):
+        """
+        Returns the length of the edge leaving every node in each direction,
+        building the table on first use after the neighbors change.
+
+        Returns:
+            tuple: The (N, 4) array of lengths in pixels for UP, DOWN, LEFT and RIGHT,
+                0 where there is no neighbor, and the same table as a list of rows.
+        """
+        if self.edgeLengths is None:
+            n = self.numNodes
+            neighbors = self.neighborIds[:n, :4]
+            offsets = self.positions[neighbors.clip(0)] - self.positions[:n, None, :]
+            lengths = np.hypot(offsets[:, :, 0], offsets[:, :, 1])
+            lengths[neighbors < 0] = 0
+            self.edgeLengths = (lengths, lengths.tolist())
+        return self.edgeLengths
+
+    def computePaths(self, names=PATHNAMES, cachedir=PATHCACHE):
+        """
+        Computes the shortest path between every pair of nodes for each entity.
+        Moves follow the access rules in place when this is called. Like entities,
+        a move onto a portal node lands on the node at the other side. The tables
+        are cached on disk, keyed by a hash of the graph and access rules, and a
+        cached file that can't be read is computed again.
+
+        The tables take names * N * N entries and O(N^3) time to build, so this is
+        only worth calling up front for small graphs. The path queries build the
+        tables on first use when the graph has at most MAXPATHTABLE nodes.
+
+        Args:
+            names (tuple): The entity names to compute tables for.
+            cachedir (str): The folder for the cached tables, or None to skip the cache.
+        """
+        self.pathNames = {name: k for k, name in enumerate(names)}
+        edges = self.getPathEdges(names)
+
+        path = None
+        if cachedir is not None:
+            digest = hashlib.sha1(repr((self.numNodes, edges)).encode()).hexdigest()
+            path = os.path.join(cachedir, "paths_" + digest + ".npz")
+            if os.path.exists(path):
+                try:
+                    with np.load(path) as data:
+                        self.pathDistances = data["distances"]
+                        self.pathDirections = data["directions"]
+                    return
+                except (OSError, ValueError, EOFError, KeyError, zipfile.BadZipFile):
+                    pass
+
+        n = self.numNodes
+        self.pathDistances = np.full((len(names), n, n), np.inf, dtype=np.float32)
+        self.pathDirections = np.full((len(names), n, n), STOP, dtype=np.int8)
+        for k in range(len(names)):
+            self.pathDistances[k], self.pathDirections[k] = self.floydWarshall(n, edges[k])
+        if path is not None:
+            writeCacheFile(path, lambda f: np.savez(f, distances=self.pathDistances, directions=self.pathDirections))
+
+    def getPathGraph(self, name):
+        """
+        Returns the moves an entity is allowed to make from every node,
+        building the list on first use after the neighbors or access rules change.
+
+        Args:
+            name (int): The name of the entity.
+
+        Returns:
+            list: For each node id, a list of (to id, direction, length) moves.
+                Moves onto a portal node end at the node on the other side.
+        """
+        if name not in self.pathGraphs:
+            n = self.numNodes
+            neighbors = self.neighborIds[:n, :4]
+            valid = ((self.accessMasks[:n] >> name) & 1 == 1) & (neighbors >= 0)
+            portals = self.neighborIds[neighbors.clip(0), DIRECTIONINDEX[PORTAL]]
+            ends = np.where(portals >= 0, portals, neighbors).tolist()
+            lengths = self.getEdgeLengths()[1]
+            graph = []
+            for id, row in enumerate(valid.tolist()):
+                graph.append([(ends[id][k], direction, lengths[id][k])
+                              for k, direction in enumerate(MOVEDIRECTIONS) if row[k]])
+            self.pathGraphs[name] = graph
+        return self.pathGraphs[name]
+
+    def getPathEdges(self, names):
+        """
+        Lists the moves each entity is allowed to make between nodes.
+
+        Args:
+            names (tuple): The entity names.
+
+        Returns:
+            list: For each name, a list of (from id, to id, direction, length) moves.
+                Moves onto a portal node end at the node on the other side.
+        """
+        edges = []
+        for name in names:
+            edges.append([(id, other, direction, length) for id, moves in enumerate(self.getPathGraph(name))
+                          for other, direction, length in moves])
+        return edges
+
+    def floydWarshall(self, n, moves):
+        """
+        Runs the Floyd-Warshall algorithm over a list of moves.
+
+        Args:
+            n (int): The number of nodes.
+            moves (list): The (from id, to id, direction, length) moves.
+
+        Returns:
+            tuple: The (n, n) distance array and the (n, n) first-direction array.
+        """
+        distances = np.full((n, n), np.inf, dtype=np.float64)
+        directions = np.full((n, n), STOP, dtype=np.int8)
+        for i, j, direction, length in moves:
+            if length < distances[i, j]:
+                distances[i, j] = length
+                directions[i, j] = direction
+        np.fill_diagonal(distances, 0)
+        for k in range(n):
+            through = distances[:, k, None] + distances[None, k, :]
+            better = through < distances
+            distances = np.where(better, through, distances)
+            directions = np.where(better, directions[:, k, None], directions)
+        return distances.astype(np.float32), directions
+
+    def getPathRow(self, id, name):
+        """
+        Returns the shortest paths from one node to every node, running Dijkstra's
+        algorithm on first use after the neighbors or access rules change.
+        Only the rows asked for are kept, so this works on graphs far too large
+        for the tables of computePaths.
+
+        Args:
+            id (int): The id of the start node.
+            name (int): The name of the entity making the trips.
+
+        Returns:
+            tuple: The N path lengths in pixels, inf where unreachable, and the
+                N first directions to take, STOP where unreachable or already there.
+        """
+        key = (name, id)
+        if key not in self.pathRows:
+            graph = self.getPathGraph(name)
+            distances = [float('inf')] * self.numNodes
+            directions = [STOP] * self.numNodes
+            distances[id] = 0.0
+            heap = [(0.0, id, STOP)]
+            while heap:
+                distance, node, first = heapq.heappop(heap)
+                if distance > distances[node]:
+                    continue
+                for other, direction, length in graph[node]:
+                    total = distance + length
+                    if total < distances[other]:
+                        distances[other] = total
+                        directions[other] = direction if node == id else first
+                        heapq.heappush(heap, (total, other, directions[other]))
+            self.pathRows[key] = (distances, directions)
+        return self.pathRows[key]
+
+    def hasPathTables(self, name):
+        """
+        Checks whether the path queries for an entity use the tables of computePaths,
+        building them first if the graph is small enough.
+
+        Args:
+            name (int): The name of the entity.
+
+        Returns:
+            bool: True if the tables are ready, False to use getPathRow instead.
+        """
+        if self.pathDistances is not None and name in self.pathNames:
+            return True
+        if self.numNodes <= MAXPATHTABLE and name in PATHNAMES:
+            self.computePaths()
+            return True
+        return False
+
+    def getPathDistance(self, node, goal, name):
+        """
+        Returns the length of the shortest path between two nodes.
+
+        Args:
+            node (Node): The start node.
+            goal (Node): The goal node.
+            name (int): The name of the entity making the trip.
+
+        Returns:
+            float: The path length in pixels, or inf if the goal can't be reached.
+        """
+        if self.hasPathTables(name):
+            return float(self.pathDistances[self.pathNames[name], node.id, goal.id])
+        return self.getPathRow(node.id, name)[0][goal.id]
+
+    def getPathDirection(self, node, goal, name):
+        """
+        Returns the direction to take from a node to follow the shortest path to a goal.
+
+        Args:
+            node (Node): The start node.
+            goal (Node): The goal node.
+            name (int): The name of the entity making the trip.
+
+        Returns:
+            int: The direction to take, or STOP if already there or unreachable.
+        """
+        if self.hasPathTables(name):
+            return int(self.pathDirections[self.pathNames[name], node.id, goal.id])
+        return self.getPathRow(node.id, name)[1][goal.id]
+
+    def invalidateTables(self):
+        """
+        Clears the valid-direction and path tables, after the neighbors or the
+        access rules change. They are built again when next needed.
+        """
+        self.validTables = {}
+        self.pathGraphs = {}
+        self.pathRows = {}
+        self.pathNames = {}
+        self.pathDistances = None
+        self.pathDirections = None
 
     def render(self, screen):
         """
@@ -377,8 +899,8 @@ class NodeGroup(object):
         Args:
             screen (pygame.Surface): The game screen.
         """
-        for node in self.nodesLUT.values():
-            node.render(screen)
+        for id in self.nodesLUT.values():
+            self.getNode(id).render(screen)
 
 # import pygame
 # from vector import Vector2
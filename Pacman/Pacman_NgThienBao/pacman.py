@@ -19,14 +19,15 @@ class Pacman(Entity):
 
     """
 
-    def __init__(self, node):
+    def __init__(self, node, rng=None):
         """Initialize Pacman with the given node.
 
         Args:
             node (Node): The starting node for Pacman.
+            rng (GameRandom, optional): The random generator of the game. Defaults to None.
 
         """
-        Entity.__init__(self, node)
+        Entity.__init__(self, node, rng)
         self.name = PACMAN
         self.color = YELLOW
         self.direction = LEFT
@@ -48,16 +49,43 @@ class Pacman(Entity):
         self.alive = False
         self.direction = STOP
 
-    def update(self, dt):
+    def getState(self):
+        """Gets the state of Pacman that changes during a game, as numbers.
+
+        Returns:
+            list: The state of the entity, followed by whether Pacman is alive.
+
+        """
+        return Entity.getState(self) + [self.alive]
+
+    def setState(self, values, start=0):
+        """Puts Pacman back in a state returned by getState.
+
+        Args:
+            values (list): The numbers of the state.
+            start (int): The index of the first number of Pacman in values.
+
+        Returns:
+            int: The index after the last number of Pacman.
+
+        """
+        start = Entity.setState(self, values, start)
+        self.alive = bool(values[start])
+        return start + 1
+
+    def update(self, dt, direction=None):
         """Update Pacman's position.
 
         Args:
             dt (float): The time elapsed since the last update.
+            direction (int, optional): The direction requested by the player.
+                Defaults to None, which reads the keyboard.
 
         """
         self.sprites.update(dt)
-        self.position += self.directions[self.direction] * self.speed * dt
-        direction = self.getValidKey()
+        self.move(dt)
+        if direction is None:
+            direction = self.getValidKey()
         if self.overshotTarget():
             self.node = self.target
             if self.node.neighbors[PORTAL] is not None:
@@ -92,17 +120,19 @@ class Pacman(Entity):
             return RIGHT
         return STOP
 
-    def eatPellets(self, pelletList):
+    def eatPellets(self, pellets):
         """Check if Pacman is eating any pellets.
 
+        Only the pellets on the tiles around Pacman are checked.
+
         Args:
-            pelletList (list): List of pellets in the game.
+            pellets (PelletGroup): The pellets in the game.
 
         Returns:
             Pellet or None: The pellet that Pacman is eating, or None if no pellet is being eaten.
 
         """
-        for pellet in pelletList:
+        for pellet in pellets.getNearbyPellets(self.position):
             if self.collideCheck(pellet):
                 return pellet
         return None
@@ -129,8 +159,7 @@ class Pacman(Entity):
             bool: True if Pacman is colliding with the other entity, False otherwise.
 
         """
-        d = self.position - other.position
-        dSquared = d.magnitudeSquared()
+        dSquared = self.position.distanceSquared(other.position)
         rSquared = (self.collideRadius + other.collideRadius) ** 2
         if dSquared <= rSquared:
             return True
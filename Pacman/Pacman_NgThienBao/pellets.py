@@ -1,8 +1,9 @@
 
 import pygame
+import numpy as np
 from vector import Vector2
 from constants import *
-import numpy as np
+from mazecompiler import loadMaze
 
 class Pellet(object):
     """
@@ -10,12 +11,15 @@ class Pellet(object):
 
     Attributes:
         name (str): The name of the pellet.
+        row (int): The row index of the pellet.
+        column (int): The column index of the pellet.
         position (Vector2): The position of the pellet on the screen.
         color (tuple): The color of the pellet.
         radius (int): The radius of the pellet.
         collideRadius (float): The collision radius of the pellet.
         points (int): The number of points the pellet is worth.
         visible (bool): Indicates whether the pellet is visible or not.
+        index (int): The position of the pellet in the pelletList of its group.
     """
 
     def __init__(self, row, column):
@@ -27,12 +31,15 @@ class Pellet(object):
             column (int): The column index of the pellet.
         """
         self.name = PELLET
+        self.row = row
+        self.column = column
         self.position = Vector2(column*TILEWIDTH, row*TILEHEIGHT)
         self.color = (0,250,200)
         self.radius = int(2 * TILEWIDTH / 16)
         self.collideRadius = 2 * TILEWIDTH / 16
         self.points = 10
         self.visible = True
+        self.index = None
 
     def render(self, screen):
         """
@@ -42,9 +49,19 @@ class Pellet(object):
             screen (pygame.Surface): The surface to render the pellet on.
         """
         if self.visible:
-            adjust = Vector2(TILEWIDTH, TILEHEIGHT) / 2
-            p = self.position + adjust
-            pygame.draw.circle(screen, self.color, p.asInt(), self.radius)
+            p = (int(self.position.x + TILEWIDTH / 2), int(self.position.y + TILEHEIGHT / 2))
+            pygame.draw.circle(screen, self.color, p, self.radius)
+
+    def getRect(self):
+        """
+        Returns the area the pellet is drawn on.
+
+        Returns:
+            pygame.Rect: The bounding rectangle of the pellet.
+        """
+        x = int(self.position.x + TILEWIDTH / 2) - self.radius - 1
+        y = int(self.position.y + TILEHEIGHT / 2) - self.radius - 1
+        return pygame.Rect(x, y, 2*self.radius + 2, 2*self.radius + 2)
 
 
 class PowerPellet(Pellet):
@@ -94,10 +111,18 @@ class PelletGroup(object):
     """
     Represents a group of pellets in the game.
 
+    Pellets are stored in a lookup table keyed by their (column, row) tile, so
+    finding the pellets under Pacman and removing an eaten pellet are constant
+    time regardless of how many pellets the maze holds.
+
     Attributes:
-        pelletList (list): A list of all the pellets in the group.
+        pelletLUT (dict): The remaining pellets, keyed by (column, row).
+        pelletList (list): Every pellet of the maze, eaten or not, in file order.
+        present (numpy.ndarray): Flags indicating which pellets of pelletList are left.
         powerpellets (list): A list of power pellets in the group.
         numEaten (int): The number of pellets eaten.
+        eaten (list): The pellets eaten since the pellets were last rendered.
+        layers (list): The (maze, layer) surface pairs the pellets are baked into.
         ...
     """
 
@@ -108,10 +133,14 @@ class PelletGroup(object):
         Args:
             pelletfile (str): The file path of the pellet data.
         """
+        self.pelletLUT = {}
         self.pelletList = []
         self.powerpellets = []
         self.createPelletList(pelletfile)
+        self.present = np.ones(len(self.pelletList), dtype=bool)
         self.numEaten = 0
+        self.eaten = []
+        self.layers = []
 
     def update(self, dt):
         """
@@ -125,41 +154,162 @@ class PelletGroup(object):
 
     def createPelletList(self, pelletfile):
         """
-        Creates a list of pellets from the pellet data file.
+        Creates the pellet lookup table from the compiled pellet data file.
 
         Args:
             pelletfile (str): The file path of the pellet data.
         """
-        data = self.readPelletfile(pelletfile)
-        for row in range(data.shape[0]):
-            for col in range(data.shape[1]):
-                if data[row][col] in ['.', '+']:
-                    self.pelletList.append(Pellet(row, col))
-                elif data[row][col] in ['P', 'p']:
-                    pp = PowerPellet(row, col)
-                    self.pelletList.append(pp)
-                    self.powerpellets.append(pp)
+        for col, row, power in loadMaze(pelletfile).pellets.tolist():
+            if power:
+                pellet = PowerPellet(row, col)
+                self.powerpellets.append(pellet)
+            else:
+                pellet = Pellet(row, col)
+            pellet.index = len(self.pelletList)
+            self.pelletList.append(pellet)
+            self.pelletLUT[(col, row)] = pellet
 
-    def readPelletfile(self, textfile):
+    def getPellet(self, col, row):
         """
-        Reads the pellet data from a text file.
+        Returns the pellet on the given tile.
+
+        Args:
+            col (int): The column of the tile.
+            row (int): The row of the tile.
+
+        Returns:
+            Pellet or None: The pellet on the tile, or None if the tile is empty.
+        """
+        return self.pelletLUT.get((col, row))
+
+    def getNearbyPellets(self, position):
+        """
+        Returns the pellets on the tiles surrounding a pixel position.
+
+        A position between tiles can only touch the (at most four) tiles whose
+        corners enclose it, so only those tiles need to be looked up.
 
         Args:
-            textfile (str): The file path of the pellet data.
+            position (Vector2): The pixel position to look around.
 
         Returns:
-            numpy.ndarray: The pellet data as a numpy array.
+            list: The pellets on the surrounding tiles.
+        """
+        col = int(position.x // TILEWIDTH)
+        row = int(position.y // TILEHEIGHT)
+        pellets = []
+        for key in ((col, row), (col+1, row), (col, row+1), (col+1, row+1)):
+            pellet = self.pelletLUT.get(key)
+            if pellet is not None:
+                pellets.append(pellet)
+        return pellets
+
+    def removePellet(self, pellet):
+        """
+        Removes an eaten pellet and updates the eaten count.
+
+        Args:
+            pellet (Pellet): The pellet that was eaten.
+        """
+        if self.pelletLUT.pop((pellet.column, pellet.row), None) is not None:
+            self.numEaten += 1
+            self.present[pellet.index] = False
+            self.eaten.append(pellet)
+            if pellet.name == POWERPELLET:
+                self.powerpellets.remove(pellet)
+            else:
+                rect = pellet.getRect()
+                for maze, layer in self.layers:
+                    layer.blit(maze, rect, rect)
+
+    def getState(self):
+        """
+        Returns the pellets left as a bitset, one bit per pellet of pelletList.
+
+        Returns:
+            numpy.ndarray: The packed bits.
+        """
+        return np.packbits(self.present)
+
+    def setState(self, bits):
+        """
+        Puts back the pellets of a bitset returned by getState. Only the pellets
+        that differ from the bitset are added or removed. The flashing of the power
+        pellets and the pellets baked into layers are left as they are.
+
+        Args:
+            bits (numpy.ndarray): The packed bits.
         """
-        return np.loadtxt(textfile, dtype='<U1')
+        present = np.unpackbits(bits, count=len(self.pelletList)).view(bool)
+        changed = np.nonzero(present != self.present)[0].tolist()
+        if len(changed) == 0:
+            return
+        power = False
+        for i in changed:
+            pellet = self.pelletList[i]
+            if present[i]:
+                self.pelletLUT[(pellet.column, pellet.row)] = pellet
+            else:
+                del self.pelletLUT[(pellet.column, pellet.row)]
+            power = power or pellet.name == POWERPELLET
+        self.present = present
+        self.numEaten = len(self.pelletList) - len(self.pelletLUT)
+        if power:
+            self.powerpellets = [pellet for pellet in self.pelletList if pellet.name == POWERPELLET and present[pellet.index]]
+
+    def createLayers(self, mazes):
+        """
+        Bakes the pellets into copies of the maze backgrounds.
+        Power pellets flash, so they are left out and drawn every frame.
+
+        Args:
+            mazes (list): The maze background surfaces.
+
+        Returns:
+            list: The background surfaces with the pellets drawn on them.
+        """
+        self.layers = []
+        for maze in mazes:
+            layer = maze.copy()
+            for pellet in self.pelletLUT.values():
+                if pellet.name == PELLET:
+                    pellet.render(layer)
+            self.layers.append((maze, layer))
+        return [layer for maze, layer in self.layers]
+
+    def convertLayers(self, mazes):
+        """
+        Swaps in the display-format maze backgrounds and converts the layers to the
+        display format, for layers baked on the level loader thread.
+
+        Args:
+            mazes (list): The maze background surfaces in the display format.
+
+        Returns:
+            list: The converted layers.
+        """
+        self.layers = [(maze, layer.convert()) for maze, (oldmaze, layer) in zip(mazes, self.layers)]
+        return [layer for maze, layer in self.layers]
+
+    def getPellets(self):
+        """
+        Returns the pellets that are drawn every frame.
+
+        Returns:
+            list: Only the power pellets if the rest are baked into layers, otherwise every pellet.
+        """
+        if len(self.layers) > 0:
+            return self.powerpellets
+        return list(self.pelletLUT.values())
 
     def isEmpty(self):
         """
-        Checks if the pellet list is empty.
+        Checks if there are no pellets left.
 
         Returns:
-            bool: True if the pellet list is empty, False otherwise.
+            bool: True if there are no pellets left, False otherwise.
         """
-        if len(self.pelletList) == 0:
+        if len(self.pelletLUT) == 0:
             return True
         return False
 
@@ -170,5 +320,39 @@ class PelletGroup(object):
         Args:
             screen (pygame.Surface): The surface to render the pellets on.
         """
-        for pellet in self.pelletList:
-            pellet.render(screen)
\ No newline at end of file
+        for pellet in self.getPellets():
+            pellet.render(screen)
+        self.eaten = []
+
+    def getDirtyRects(self):
+        """
+        Returns the areas changed since the pellets were last rendered:
+        the eaten pellets and the flashing power pellets.
+
+        Returns:
+            list: The changed areas as pygame.Rect objects.
+        """
+        rects = [pellet.getRect() for pellet in self.eaten]
+        rects += [pellet.getRect() for pellet in self.powerpellets]
+        self.eaten = []
+        return rects
+
+    def renderArea(self, screen, rects):
+        """
+        Renders only the drawn-every-frame pellets overlapping the given areas.
+
+        Args:
+            screen (pygame.Surface): The surface to render the pellets on.
+            rects (list): The areas to redraw as pygame.Rect objects.
+        """
+        if len(self.layers) > 0:
+            for pellet in self.powerpellets:
+                if pellet.getRect().collidelist(rects) != -1:
+                    pellet.render(screen)
+            return
+        for rect in rects:
+            for row in range(rect.top // TILEHEIGHT - 1, rect.bottom // TILEHEIGHT + 1):
+                for col in range(rect.left // TILEWIDTH - 1, rect.right // TILEWIDTH + 1):
+                    pellet = self.pelletLUT.get((col, row))
+                    if pellet is not None and rect.colliderect(pellet.getRect()):
+                        pellet.render(screen)
@@ -0,0 +1,277 @@
+'''Plays a recorded game back headlessly, run from the Pacman folder:
+python Pacman_NgThienBao/replay.py game.replay'''
+import os
+import sys
+import time
+import zlib
+import struct
+import numpy as np
+from constants import *
+from simulation import Simulation
+
+MAGIC = b"PMRP"
+# Bản 1 không có checksum, bản 2 có checksum sau mỗi tick, bản 3 sau mỗi CHECKINTERVAL tick
+VERSION = 3
+# magic, version, seed, timestep, crowd size, ticks, score, level, lives, runs
+OLDHEADER = struct.Struct("<4sHQdIQqiiI")
+# như OLDHEADER, thêm số tick giữa hai checksum
+HEADER = struct.Struct("<4sHQdIQqiiII")
+INPUTS = [STOP, UP, DOWN, LEFT, RIGHT]
+# Bit 3 trở lên: số lần nhấn Space trước tick
+TOGGLESHIFT = 3
+MAXTOGGLES = 31
+CHECKINTERVAL = 60
+
+
+class Replay(object):
+    """
+    The inputs of one game, one per simulation tick, kept run-length encoded.
+    Each input is the index of the direction in INPUTS, plus the number of times
+    the player paused or resumed since the last tick shifted up by TOGGLESHIFT.
+
+    Attributes:
+        seed (int): The seed of the random generator of the game.
+        timestep (float): The game time of one tick.
+        crowdSize (int): The number of extra ghosts of the crowd mode.
+        counts (list): The number of ticks of each run.
+        values (list): The input of each run.
+        interval (int): The number of ticks between two checksums.
+        checksums (list): The stateChecksum of the game after every interval ticks,
+            empty for version 1 files.
+        ticks (int): The number of ticks recorded.
+        toggles (int): The pauses and resumes since the last tick.
+        score (int): The score at the end of the recording.
+        level (int): The level at the end of the recording.
+        lives (int): The lives left at the end of the recording.
+    """
+
+    def __init__(self, seed, timestep, crowdSize=0, interval=CHECKINTERVAL):
+        """
+        Initializes an empty Replay object.
+
+        Args:
+            seed (int): The seed of the random generator of the game.
+            timestep (float): The game time of one tick.
+            crowdSize (int): The number of extra ghosts of the crowd mode.
+            interval (int): The number of ticks between two checksums.
+        """
+        self.seed = seed
+        self.timestep = timestep
+        self.crowdSize = crowdSize
+        self.interval = interval
+        self.counts = []
+        self.values = []
+        self.checksums = []
+        self.ticks = 0
+        self.toggles = 0
+        self.score = 0
+        self.level = 0
+        self.lives = 0
+
+    def addToggle(self):
+        """
+        Records the player pausing or resuming the game before the next tick.
+        """
+        self.toggles += 1
+
+    def addTick(self, direction):
+        """
+        Records the direction of one tick.
+
+        Args:
+            direction (int): The direction returned by Pacman.getValidKey.
+        """
+        value = INPUTS.index(direction) | (min(self.toggles, MAXTOGGLES) << TOGGLESHIFT)
+        self.toggles = 0
+        if len(self.values) > 0 and self.values[-1] == value:
+            self.counts[-1] += 1
+        else:
+            self.counts.append(1)
+            self.values.append(value)
+        self.ticks += 1
+
+    def addChecksum(self, game):
+        """
+        Records the state of the game after the last tick recorded, when that
+        tick ends an interval.
+
+        Args:
+            game (Simulation): The recorded game.
+        """
+        if self.ticks % self.interval == 0:
+            self.checksums.append(stateChecksum(game))
+
+    def setResult(self, game):
+        """
+        Records the state the game ended in, to check the playback against.
+
+        Args:
+            game (Simulation): The recorded game.
+        """
+        self.score = game.score
+        self.level = game.level
+        self.lives = game.lives
+
+    def save(self, path):
+        """
+        Writes the replay to a binary file: a header, then the tick count of every
+        run as uint32, the input of every run as uint8 and the checksum of every
+        interval as uint32.
+
+        Args:
+            path (str): The path of the replay file.
+        """
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.timestep, self.crowdSize, self.ticks,
+                                self.score, self.level, self.lives, len(self.counts), self.interval))
+            f.write(np.array(self.counts, dtype='<u4').tobytes())
+            f.write(np.array(self.values, dtype=np.uint8).tobytes())
+            f.write(np.array(self.checksums, dtype='<u4').tobytes())
+
+    def inputs(self):
+        """
+        Yields the input of every tick.
+
+        Yields:
+            tuple: The direction and the number of pauses and resumes before the tick.
+        """
+        for count, value in zip(self.counts, self.values):
+            direction = INPUTS[value & ((1 << TOGGLESHIFT) - 1)]
+            toggles = value >> TOGGLESHIFT
+            for i in range(count):
+                yield direction, toggles
+
+
+def stateChecksum(game):
+    """
+    Computes a checksum of the state of a game, from the numbers and pellet
+    bitset of its snapshot and the positions of its crowd.
+
+    Args:
+        game (Simulation): The game.
+
+    Returns:
+        int: The CRC-32 of the state.
+    """
+    state = game.snapshot()
+    checksum = zlib.crc32(state.values.tobytes())
+    checksum = zlib.crc32(state.pellets.tobytes(), checksum)
+    if state.crowd is not None:
+        checksum = zlib.crc32(state.crowd[0][0].tobytes(), checksum)
+    return checksum
+
+
+def loadReplay(path):
+    """
+    Reads a replay file written by Replay.save, or by an older version.
+
+    Args:
+        path (str): The path of the replay file.
+
+    Returns:
+        Replay: The replay.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, seed, timestep, crowdSize, ticks, score, level, lives, runs = OLDHEADER.unpack_from(data)
+    if magic != MAGIC or version < 1 or version > VERSION:
+        raise ValueError("%s is not a version 1 to %d replay file" % (path, VERSION))
+    if version >= 3:
+        interval = HEADER.unpack_from(data)[-1]
+        offset = HEADER.size
+    else:
+        interval = 1
+        offset = OLDHEADER.size
+    replay = Replay(seed, timestep, crowdSize, interval)
+    replay.counts = np.frombuffer(data, dtype='<u4', count=runs, offset=offset).tolist()
+    replay.values = np.frombuffer(data, dtype=np.uint8, count=runs, offset=offset + 4*runs).tolist()
+    if version >= 2:
+        replay.checksums = np.frombuffer(data, dtype='<u4', count=ticks // interval, offset=offset + 5*runs).tolist()
+    replay.ticks = ticks
+    replay.score = score
+    replay.level = level
+    replay.lives = lives
+    return replay
+
+
+class ReplayGame(Simulation):
+    """
+    A headless game that waits for the player at the start of every level and
+    after every life lost, as GameController does, so the recorded pauses line up.
+    """
+
+    def __init__(self, seed, crowdSize=0):
+        """
+        Initializes a ReplayGame object.
+
+        Args:
+            seed (int): The seed of the random generator.
+            crowdSize (int): The number of extra ghosts of the crowd mode.
+        """
+        Simulation.__init__(self, headless=True, crowdSize=crowdSize, seed=seed)
+
+    def waitForStart(self):
+        """
+        Pauses the game until the recorded player starts it.
+        """
+        self.pause.paused = True
+
+
+def playReplay(replay):
+    """
+    Plays a replay back as fast as possible, without a display, checking the
+    state at the end of every interval against the recorded checksums.
+
+    Args:
+        replay (Replay): The replay.
+
+    Returns:
+        tuple: The ReplayGame at the end of the replay, and the first and last
+            tick of the first interval whose state differs from the recording,
+            or None if every interval matches.
+    """
+    game = ReplayGame(replay.seed, replay.crowdSize)
+    game.startGame()
+    timestep = replay.timestep
+    interval = replay.interval
+    checksums = replay.checksums
+    mismatch = None
+    for tick, (direction, toggles) in enumerate(replay.inputs()):
+        for i in range(toggles):
+            game.togglePause()
+        game.update(timestep, direction)
+        index, rest = divmod(tick + 1, interval)
+        if mismatch is None and rest == 0 and index <= len(checksums) and stateChecksum(game) != checksums[index - 1]:
+            mismatch = (tick + 1 - interval, tick)
+    return game, mismatch
+
+
+def verifyReplay(path):
+    """
+    Plays a replay file back and prints whether it matches the recording.
+
+    Args:
+        path (str): The path of the replay file.
+
+    Returns:
+        int: The exit status, 0 if the playback matches and 1 otherwise.
+    """
+    replay = loadReplay(path)
+    start = time.perf_counter()
+    game, mismatch = playReplay(replay)
+    elapsed = time.perf_counter() - start
+    same = mismatch is None and (game.score, game.level, game.lives) == (replay.score, replay.level, replay.lives)
+    print("%d ticks in %.2f s (%.0f ticks per second), score %d level %d lives %d, %s the recording" % (
+        replay.ticks, elapsed, replay.ticks / max(elapsed, 1e-9), game.score, game.level, game.lives,
+        "matches" if same else "DOES NOT MATCH"))
+    if len(replay.checksums) == 0:
+        print("no tick checksums in this file, only the final score, level and lives were checked")
+    elif mismatch is not None:
+        print("the state first differs between ticks %d and %d" % mismatch)
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    sys.exit(verifyReplay(sys.argv[1]))
@@ -0,0 +1,260 @@
+'''Plays many seeded headless games over a process pool, run from the Pacman folder:
+python Pacman_NgThienBao/rollout.py --seeds 1000 --levels 0 1 --policies random turns'''
+import os
+import time
+import random
+import argparse
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from constants import *
+from vecenv import EnvGame, preloadMazes
+
+MOVES = [UP, DOWN, LEFT, RIGHT]
+COLUMNS = [("maze", "U8"), ("level", np.int32), ("seed", np.int64), ("policy", "U16"),
+           ("score", np.int32), ("levelReached", np.int32), ("livesLost", np.int32),
+           ("frames", np.int32), ("ghostsEaten", np.int32)]
+
+
+def randomPolicy(game, rng, direction):
+    """Picks a new random direction about every quarter of a second.
+
+    Args:
+        game (RolloutGame): The game being played.
+        rng (random.Random): The random generator of the game.
+        direction (int): The direction of the last frame.
+
+    Returns:
+        int: The direction for this frame.
+    """
+    if game.frames % 15 == 0:
+        return rng.choice(MOVES)
+    return direction
+
+
+def turnsPolicy(game, rng, direction):
+    """Keeps going until Pacman stops, then turns a random way.
+
+    Args:
+        game (RolloutGame): The game being played.
+        rng (random.Random): The random generator of the game.
+        direction (int): The direction of the last frame.
+
+    Returns:
+        int: The direction for this frame.
+    """
+    if game.pacman.direction == STOP:
+        return rng.choice(MOVES)
+    return direction
+
+
+POLICIES = {"random": randomPolicy, "turns": turnsPolicy}
+
+
+class RolloutGame(EnvGame):
+    """
+    A headless game that counts the lives lost and the ghosts eaten.
+
+    Attributes:
+        livesLost (int): The number of times a ghost caught Pacman.
+        ghostsEaten (int): The number of ghosts Pacman ate in Freight mode.
+    """
+
+    def __init__(self, level=0, seed=None):
+        """
+        Initializes and starts a RolloutGame object.
+
+        Args:
+            level (int): The level to start from.
+            seed (int): The seed of the random generator of the game, None to pick one.
+        """
+        self.livesLost = 0
+        self.ghostsEaten = 0
+        EnvGame.__init__(self, level, seed)
+
+    def snapshotExtra(self):
+        """
+        Captures the state of the EnvGame and the counts.
+
+        Returns:
+            tuple: The copied state.
+        """
+        return EnvGame.snapshotExtra(self), self.livesLost, self.ghostsEaten
+
+    def restoreExtra(self, extra):
+        """
+        Puts back the state returned by snapshotExtra.
+
+        Args:
+            extra (tuple): The state.
+        """
+        extra, self.livesLost, self.ghostsEaten = extra
+        EnvGame.restoreExtra(self, extra)
+
+    def pacmanDied(self):
+        """
+        Counts a lost life.
+        """
+        self.livesLost += 1
+
+    def ghostEaten(self, ghost):
+        """
+        Counts an eaten ghost.
+
+        Args:
+            ghost (Ghost): The ghost that was eaten.
+        """
+        self.ghostsEaten += 1
+
+
+def runJob(job, maxFrames, dt):
+    """
+    Plays one game until the game is over or it reaches maxFrames.
+
+    Args:
+        job (tuple): The (level, seed, policy) of the game.
+        maxFrames (int): The number of frames after which the game is cut short.
+        dt (float): The time of one frame.
+
+    Returns:
+        dict: The value of each of COLUMNS.
+    """
+    level, seed, policy = job
+    rng = random.Random(seed)
+    choose = POLICIES[policy]
+    game = RolloutGame(level, seed)
+    direction = LEFT
+    while not game.over and game.frames < maxFrames:
+        direction = choose(game, rng, direction)
+        game.update(dt, direction)
+        game.frames += 1
+    return {"maze": game.mazedata.obj.name, "level": level, "seed": seed, "policy": policy,
+            "score": game.score, "levelReached": game.level, "livesLost": game.livesLost,
+            "frames": game.frames, "ghostsEaten": game.ghostsEaten}
+
+
+class ResultWriter(object):
+    """
+    Writes results to a columnar file as they come in. Every chunkSize rows the
+    buffered rows are saved as one NumPy array per column, one after the other,
+    so a run that stops early keeps every chunk already written.
+
+    Attributes:
+        file (file): The open results file.
+        chunkSize (int): The number of rows in a chunk.
+        rows (list): The rows not written yet.
+        count (int): The number of rows added.
+    """
+
+    def __init__(self, path, chunkSize=256):
+        """
+        Initializes a ResultWriter object, replacing the file at path.
+
+        Args:
+            path (str): The path of the results file.
+            chunkSize (int): The number of rows in a chunk.
+        """
+        self.file = open(path, 'wb')
+        self.chunkSize = chunkSize
+        self.rows = []
+        self.count = 0
+
+    def add(self, row):
+        """
+        Adds one row, writing a chunk when enough rows are buffered.
+
+        Args:
+            row (dict): The value of each of COLUMNS.
+        """
+        self.rows.append(row)
+        self.count += 1
+        if len(self.rows) >= self.chunkSize:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered rows as a chunk.
+        """
+        if len(self.rows) > 0:
+            for name, dtype in COLUMNS:
+                np.save(self.file, np.array([row[name] for row in self.rows], dtype=dtype))
+            self.file.flush()
+            self.rows = []
+
+    def close(self):
+        """
+        Writes the last rows and closes the file.
+        """
+        self.flush()
+        self.file.close()
+
+
+def readResults(path):
+    """
+    Reads a results file written by ResultWriter.
+
+    Args:
+        path (str): The path of the results file.
+
+    Returns:
+        dict: The array of each of COLUMNS.
+    """
+    chunks = {name: [] for name, dtype in COLUMNS}
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        while f.tell() < size:
+            for name, dtype in COLUMNS:
+                chunks[name].append(np.load(f))
+    return {name: np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtype)
+            for (name, dtype), arrays in zip(COLUMNS, chunks.values())}
+
+
+def runRollouts(jobs, path, workers=None, maxFrames=36000, tickRate=60):
+    """
+    Plays every job over a process pool and streams the results to a file in the
+    order they finish. The mazes are compiled before the pool starts and again in
+    each worker if needed, so no game parses a maze file.
+
+    Args:
+        jobs (list): The (level, seed, policy) of every game.
+        path (str): The path of the results file.
+        workers (int): The number of worker processes, None for one per CPU.
+        maxFrames (int): The number of frames after which a game is cut short.
+        tickRate (int): The number of frames per second of game time.
+
+    Returns:
+        int: The number of games played.
+    """
+    preloadMazes()
+    writer = ResultWriter(path)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=preloadMazes) as pool:
+            futures = [pool.submit(runJob, job, maxFrames, 1.0 / tickRate) for job in jobs]
+            for future in as_completed(futures):
+                writer.add(future.result())
+    finally:
+        writer.close()
+    return writer.count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play seeded headless games over a process pool.")
+    parser.add_argument("--seeds", type=int, default=100, help="number of seeds per level and policy")
+    parser.add_argument("--first-seed", type=int, default=0, help="the first seed")
+    parser.add_argument("--levels", type=int, nargs="+", default=[0], help="levels to start from, the maze follows the level")
+    parser.add_argument("--policies", nargs="+", default=["random"], choices=sorted(POLICIES.keys()))
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, one per CPU by default")
+    parser.add_argument("--max-frames", type=int, default=36000, help="frames after which a game is cut short")
+    parser.add_argument("--tick-rate", type=int, default=60, help="frames per second of game time")
+    parser.add_argument("--out", default="rollouts.columns", help="the results file")
+    args = parser.parse_args()
+
+    jobs = [(level, seed, policy) for level in args.levels for policy in args.policies
+            for seed in range(args.first_seed, args.first_seed + args.seeds)]
+    start = time.perf_counter()
+    count = runRollouts(jobs, args.out, args.workers, args.max_frames, args.tick_rate)
+    results = readResults(args.out)
+    print("%d games in %.1f s, mean score %.1f, mean level reached %.2f, written to %s" % (
+        count, time.perf_counter() - start, results["score"].mean() if count else 0,
+        results["levelReached"].mean() if count else 0, args.out))
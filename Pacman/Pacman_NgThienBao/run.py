@@ -2,20 +2,19 @@ import pygame  # Initialize Pygame
 from pygame.locals import *  # Import constants like QUIT, KEYDOWN, K_SPACE, etc.
 from constants import *  # Import game-specific constants
 from sys import *  # Import system functions and environment variables
-from pacman import Pacman  # Import Pacman class
-from nodes import NodeGroup  # Import NodeGroup class
-from pellets import PelletGroup  # Import PelletGroup class
-from ghosts import GhostGroup  # Import GhostGroup class
-from fruit import Fruit  # Import Fruit class
-from pauser import Pause  # Import Pause class
+from simulation import Simulation  # Import Simulation class
 from text import TextGroup  # Import TextGroup class
+from text import getFont  # Import shared font cache
 from sprites import LifeSprites  # Import LifeSprites class
 from sprites import MazeSprites  # Import MazeSprites class
-from mazedata import MazeData  # Import MazeData class
+from sprites import copyAtlases, setThreadAtlases  # Import per-thread spritesheet copies
+from sounds import SoundBank  # Import SoundBank class
+from replay import Replay, verifyReplay  # Import replay recording and playback
 
-class GameController(object):
+class GameController(Simulation):
     """
-    The main game controller class. Manages game logic, rendering, and events.
+    The main game controller class. Adds rendering, sound, text and keyboard
+    events to the game logic of Simulation.
 
     Attributes:
         screen (pygame.Surface): The main game window.
@@ -23,6 +22,10 @@ class GameController(object):
         background_norm (pygame.Surface): The normal background image.
         background_flash (pygame.Surface): The flashing background image.
         clock (pygame.time.Clock): The game clock for controlling frame rate.
+        fps (int): The maximum number of frames rendered per second.
+        timestep (float): The game time advanced by one simulation tick.
+        accumulator (float): The game time not yet simulated.
+        alpha (float): How far the rendered frame lies between the last two ticks.
         fruit (Fruit): The fruit object, if present.
         pause (Pause): The pause object for handling game pauses.
         level (int): The current game level.
@@ -36,8 +39,14 @@ class GameController(object):
         fruitCaptured (list): A list of fruit sprites that have been captured.
         fruitNode (Node): The node where the fruit spawns.
         mazedata (MazeData): The data object containing information about the maze.
+        sounds (SoundBank): The preloaded sound effects.
         running (bool): Flag indicating whether the game is running.
         high_score (int): The highest score achieved.
+        dirtyRender (bool): Flag indicating whether only the changed areas of the screen are redrawn.
+        dirtyBackground (pygame.Surface): The background the screen was last redrawn from.
+        drawn (list): The (surface, rect) pairs drawn over the maze in the last frame.
+        replay (Replay): The inputs recorded so far, or None when not recording.
+        replayPath (str): The file the replay is saved to when the game is closed.
 
     Methods:
         setBackground(): Creates the normal and flashing background images.
@@ -46,21 +55,28 @@ class GameController(object):
         startGame(): Initializes a new game level.
         update(): Updates game logic, events, and rendering.
         checkEvents(): Handles keyboard and mouse events.
-        checkPelletEvents(): Checks for Pacman eating pellets and power pellets.
-        checkGhostEvents(): Checks for Pacman colliding with ghosts.
-        checkFruitEvents(): Checks for Pacman eating the fruit.
-        showEntities(): Shows Pacman and ghosts.
-        hideEntities(): Hides Pacman and ghosts.
+        powerPelletEaten(), ghostEaten(), pacmanDied(), gameOver(), fruitEaten(),
+        levelCompleted(): Play sounds and update the text and HUD for game events.
         nextLevel(): Starts the next level.
         restartGame(): Restarts the game from the beginning.
         resetLevel(): Resets the current level.
         updateScore(): Updates the player's score.
         render(): Renders game objects to the screen.
+        renderFull(): Redraws the whole screen.
+        renderDirty(): Redraws only the areas of the screen that changed.
+        renderScene(): Draws the entities, text and HUD.
     """
 
-    def __init__(self):
+    def __init__(self, tickRate=60, fps=60, crowdSize=0, seed=None, replayPath=None):
         """
         Initializes the GameController object.
+
+        Args:
+            tickRate (int): The number of simulation ticks per second.
+            fps (int): The maximum number of frames rendered per second.
+            crowdSize (int): The number of extra ghosts to add to every level.
+            seed (int): The seed of the random generator, None to pick one.
+            replayPath (str): The file to record the game's inputs to, or None.
         """
         pygame.init()  # Initialize Pygame
         pygame.mixer.init()  # Initialize sound mixer
@@ -69,32 +85,32 @@ class GameController(object):
         self.background_norm = None  # Initialize normal background image
         self.background_flash = None  # Initialize flashing background image
         self.clock = pygame.time.Clock()  # Create a game clock
-        self.fruit = None  # Initialize fruit object
-        self.pause = Pause(True)  # Initialize pause object
-        self.level = 0  # Initialize level
-        self.lives = 8  # Initialize lives
-        self.score = 0  # Initialize score
+        self.fps = fps  # Set render rate
+        self.timestep = 1000.0 / tickRate / 800.0  # Game time per tick, 800 ms of real time make one game second
+        self.accumulator = 0  # Game time waiting to be simulated
+        self.alpha = 1.0  # Interpolation between the last two ticks
+        Simulation.__init__(self, headless=False, crowdSize=crowdSize, seed=seed)  # Initialize game state
         self.textgroup = TextGroup()  # Initialize text group
         self.lifesprites = LifeSprites(self.lives)  # Initialize life sprites
         self.flashBG = False  # Initialize background flash flag
         self.flashTime = 0.2  # Set background flash duration
         self.flashTimer = 0  # Initialize background flash timer
         self.fruitCaptured = []  # Initialize list of captured fruit sprites
-        self.fruitNode = None  # Initialize fruit node
-        self.mazedata = MazeData()  # Initialize maze data
+        self.sounds = SoundBank()  # Decode sound effects once
         self.running = True  # Set game running flag
-        self.high_score = 0  # Initialize high score
+        self.dirtyRender = True  # Redraw only the changed areas of the screen
+        self.dirtyBackground = None  # Background used by the last redraw
+        self.drawn = []  # Surfaces drawn over the maze in the last frame
+        self.replayPath = replayPath  # File the recorded inputs are saved to
+        self.replay = Replay(self.rng.seed, self.timestep, crowdSize) if replayPath is not None else None  # Recorded inputs
 
     def setBackground(self):
         """
-        Creates the normal and flashing background images for the current level.
+        Sets the normal and flashing background images for the current level,
+        with the pellets baked into them.
         """
-        self.background_norm = pygame.surface.Surface(SCREENSIZE).convert()  # Create normal background surface
-        self.background_norm.fill(OPTIONAL)  # Fill with optional color
-        self.background_flash = pygame.surface.Surface(SCREENSIZE).convert()  # Create flashing background surface
-        self.background_flash.fill(BLACK)  # Fill with black color
-        self.background_norm = self.mazesprites.constructBackground(self.background_norm, self.level % 5)  # Construct maze for normal background
-        self.background_flash = self.mazesprites.constructBackground(self.background_flash, 5)  # Construct maze for flashing background
+        mazes = [self.mazesprites.getBackground(self.level % 5, OPTIONAL), self.mazesprites.getBackground(5, BLACK)]  # Normal and flashing backgrounds, drawn once per maze and palette
+        self.background_norm, self.background_flash = self.pellets.convertLayers(mazes)  # Pellet layers baked by buildLevel
         self.flashBG = False  # Reset background flash flag
         self.background = self.background_norm  # Set initial background to normal
 
@@ -111,7 +127,7 @@ class GameController(object):
                         return
 
             self.screen.fill((0, 250, 255))  # Fill background with light blue
-            font = pygame.font.Font("Pacman_NgThienBao/UVN.TTF", 28)  # Set font for instructions
+            font = getFont("Pacman_NgThienBao/UVN.TTF", 28)  # Set font for instructions
 
             instructions = ["ĐỒ ÁN CUỐI KỲ DSA", "GAME PACMAN", "Nguyễn Thiên Bảo", "Nhấn Space để tiếp tục"]
             for i, instruction in enumerate(instructions):
@@ -144,7 +160,7 @@ class GameController(object):
             "[5 Cm/s]"
         ]
         self.music_option_texts = []  # List to store rendered music option texts
-        font = pygame.font.Font("Pacman_NgThienBao/UVN.TTF", 20)  # Set font for music options and instructions
+        font = getFont("Pacman_NgThienBao/UVN.TTF", 20)  # Set font for music options and instructions
         instructions = ["Click chuột để chọn nhạc, có thể không chọn", "Nhấn Space để chơi và tạm dừng", "Giữ nút mũi tên để di chuyển"]  # List of game instructions
         self.music_option_states = [False] * len(self.music_option_names)  # Initialize music option states (False by default)
         for i, instruction in enumerate(instructions):
@@ -192,48 +208,92 @@ class GameController(object):
 
     def startGame(self):
         """
-        Initializes a new game level.
+        Initializes a new game level and builds its backgrounds.
         """
-        self.mazedata.loadMaze(self.level)
-        self.mazesprites = MazeSprites(self.mazedata.obj.name + ".txt", self.mazedata.obj.name + "_rotation.txt")
+        Simulation.startGame(self)
         self.setBackground()
-        self.nodes = NodeGroup("Pacman_NgThienBao/" + self.mazedata.obj.name + ".txt")
-        self.mazedata.obj.setPortalPairs(self.nodes)
-        self.mazedata.obj.connectHomeNodes(self.nodes)
-        self.pacman = Pacman(self.nodes.getNodeFromTiles(*self.mazedata.obj.pacmanStart))
-        self.pellets = PelletGroup("Pacman_NgThienBao/" + self.mazedata.obj.name + ".txt")
-        self.ghosts = GhostGroup(self.nodes.getStartTempNode(), self.pacman)
-        self.ghosts.pinky.setStartNode(self.nodes.getNodeFromTiles(*self.mazedata.obj.addOffset(2, 3)))
-        self.ghosts.inky.setStartNode(self.nodes.getNodeFromTiles(*self.mazedata.obj.addOffset(0, 3)))
-        self.ghosts.clyde.setStartNode(self.nodes.getNodeFromTiles(*self.mazedata.obj.addOffset(4, 3)))
-        self.ghosts.setSpawnNode(self.nodes.getNodeFromTiles(*self.mazedata.obj.addOffset(2, 3)))
-        self.ghosts.blinky.setStartNode(self.nodes.getNodeFromTiles(*self.mazedata.obj.addOffset(2, 0)))
-        self.nodes.denyHomeAccess(self.pacman)
-        self.nodes.denyHomeAccessList(self.ghosts)
-        self.ghosts.inky.startNode.denyAccess(RIGHT, self.ghosts.inky)
-        self.ghosts.clyde.startNode.denyAccess(LEFT, self.ghosts.clyde)
-        self.mazedata.obj.denyGhostsAccess(self.ghosts, self.nodes)
+
+    def preloadLevel(self, number):
+        """
+        Starts building a level on the loader thread. The spritesheets are copied
+        here on the main thread, so the loader slices, rotates and draws only from
+        its own copies while the main thread keeps drawing from the shared sheets.
+
+        Args:
+            number (int): The level number.
+        """
+        self.preloading = (number, self.getLoader().submit(self.buildLevel, number, copyAtlases()))
+
+    def buildLevel(self, number, atlases=None):
+        """
+        Builds a level along with its maze sprites, any backgrounds not drawn yet and
+        the pellet layers. New surfaces are left in the spritesheet's pixel format,
+        setLevel and setBackground convert them for the display on the main thread.
+
+        Args:
+            number (int): The level number.
+            atlases (dict): The spritesheet copies to draw from on the loader thread,
+                or None to use the shared ones.
+
+        Returns:
+            Level: The new level.
+        """
+        if atlases is None:
+            return self.buildLevelSprites(Simulation.buildLevel(self, number), number, False)
+        setThreadAtlases(atlases)
+        try:
+            return self.buildLevelSprites(Simulation.buildLevel(self, number), number, True)
+        finally:
+            setThreadAtlases(None)
+
+    def buildLevelSprites(self, level, number, ownSurfaces):
+        """
+        Adds the maze sprites, backgrounds and pellet layers to a level.
+
+        Args:
+            level (Level): The level built by Simulation.buildLevel.
+            number (int): The level number.
+            ownSurfaces (bool): Whether to draw every background from the thread's own
+                atlases instead of reusing the cached ones the main thread draws from.
+
+        Returns:
+            Level: The level.
+        """
+        level.mazesprites = MazeSprites(level.maze.name + ".txt", level.maze.name + "_rotation.txt")
+        level.backgrounds = []
+        mazes = []
+        for y, color in [(number % 5, OPTIONAL), (5, BLACK)]:
+            cached = level.mazesprites.hasBackground(y, color)
+            if cached and not ownSurfaces:
+                mazes.append(level.mazesprites.getBackground(y, color))
+            else:
+                background = level.mazesprites.composeBackground(y, color)
+                if not cached:
+                    level.backgrounds.append((y, color, background))
+                mazes.append(background)
+        level.pellets.createLayers(mazes)
+        return level
+
+    def setLevel(self, level):
+        """
+        Swaps a level into the game along with its maze sprites and backgrounds.
+
+        Args:
+            level (Level): The level to play.
+        """
+        Simulation.setLevel(self, level)
+        self.mazesprites = level.mazesprites
+        for y, color, background in level.backgrounds:
+            self.mazesprites.addBackground(y, color, background)
 
     def update(self):
         """
         Updates the game state, events, and rendering.
+        The simulation advances in fixed ticks of timestep, as many as the elapsed
+        time allows, and the frame is drawn between the last two ticks.
         """
-        dt = self.clock.tick(30) / 800.0
+        dt = self.clock.tick(self.fps) / 800.0
         self.textgroup.update(dt)
-        self.pellets.update(dt)
-        if not self.pause.paused:
-            self.ghosts.update(dt)
-            if self.fruit is not None:
-                self.fruit.update(dt)
-            self.checkPelletEvents()
-            self.checkGhostEvents()
-            self.checkFruitEvents()
-
-        if self.pacman.alive:
-            if not self.pause.paused:
-                self.pacman.update(dt)
-        else:
-            self.pacman.update(dt)
 
         if self.flashBG:
             self.flashTimer += dt
@@ -244,9 +304,20 @@ class GameController(object):
                 else:
                     self.background = self.background_norm
 
-        afterPauseMethod = self.pause.update(dt)
-        if afterPauseMethod is not None:
-            afterPauseMethod()
+        direction = self.pacman.getValidKey()
+        self.accumulator = min(self.accumulator + dt, 0.25)  # Drop time after long stalls instead of catching up
+        while self.accumulator >= self.timestep:
+            for entity in self.getEntities():
+                entity.savePosition()
+            if self.crowd is not None:
+                self.crowd.savePositions()
+            if self.replay is not None:
+                self.replay.addTick(direction)  # Record the input of this tick
+            Simulation.update(self, self.timestep, direction)
+            if self.replay is not None:
+                self.replay.addChecksum(self)  # Record the state after this tick
+            self.accumulator -= self.timestep
+        self.alpha = self.accumulator / self.timestep
         self.checkEvents()
         self.render()
 
@@ -256,118 +327,82 @@ class GameController(object):
         """
         for event in pygame.event.get():
             if event.type == QUIT:
+                self.saveReplay()
+                self.close()  # Stop the level loader thread
                 exit()
             elif event.type == KEYDOWN:
                 if event.key == K_SPACE:
-                    if self.pacman.alive:
-                        self.pause.setPause(playerPaused=True)
-                        if not self.pause.paused:
-                            self.textgroup.hideText()
-                            self.showEntities()
-                        else:
-                            self.textgroup.showText(PAUSETXT)
-                            # self.hideEntities()
-
-    def checkPelletEvents(self):
-        """
-        Checks for Pacman eating pellets and power pellets.
-        """
-        pellet = self.pacman.eatPellets(self.pellets.pelletList)
-        if pellet:
-            self.pellets.numEaten += 1
-            self.updateScore(pellet.points)
-            if self.pellets.numEaten == 30:
-                self.ghosts.inky.startNode.allowAccess(RIGHT, self.ghosts.inky)
-            if self.pellets.numEaten == 70:
-                self.ghosts.clyde.startNode.allowAccess(LEFT, self.ghosts.clyde)
-            self.pellets.pelletList.remove(pellet)
-            if pellet.name == POWERPELLET:
-                effect_sound = pygame.mixer.Sound("Pacman_NgThienBao/WAKUWAKU.mp3")
-                effect_sound.play()
-                self.ghosts.startFreight()
-            if self.pellets.isEmpty():
-                self.flashBG = True
-                self.hideEntities()
-                self.pause.setPause(pauseTime=3, func=self.nextLevel)
-
-    def checkGhostEvents(self):
-        """
-        Checks for Pacman colliding with ghosts.
-        """
-        for ghost in self.ghosts:
-            if self.pacman.collideGhost(ghost):
-                if ghost.mode.current is FREIGHT:
-                    effect_sound = pygame.mixer.Sound("Pacman_NgThienBao/WAKUWAKU.mp3")
-                    effect_sound.play()
-                    self.pacman.visible = False
-                    ghost.visible = False
-                    self.updateScore(ghost.points)
-                    self.textgroup.addText(str(ghost.points), WHITE, ghost.position.x, ghost.position.y, 8, time=1)
-                    self.ghosts.updatePoints()
-                    self.pause.setPause(pauseTime=1, func=self.showEntities)
-                    ghost.startSpawn()
-                    self.nodes.allowHomeAccess(ghost)
-                elif ghost.mode.current is not SPAWN:
-                    if self.pacman.alive:
-                        self.lives -= 1
-                        self.lifesprites.removeImage()
-                        self.pacman.die()
-                        self.ghosts.hide()
-                        effect_sound = pygame.mixer.Sound("Pacman_NgThienBao/WAKUWAKU.mp3")
-                        effect_sound.play()
-                        if self.lives <= 0:
-                            pygame.mixer.music.stop()
-                            self.textgroup.showText(GAMEOVERTXT)
-                            self.pause.setPause(pauseTime=3, func=self.restartGame)
-                            self.high_score = max(self.score, self.high_score)
-                        else:
-                            self.pause.setPause(pauseTime=3, func=self.resetLevel)
-
-    def checkFruitEvents(self):
-        """
-        Checks for Pacman eating the fruit.
-        """
-        if self.pellets.numEaten == 50 or self.pellets.numEaten == 140:
-            if self.fruit is None:
-                self.fruit = Fruit(self.nodes.getNodeFromTiles(9, 20), self.level)
-                print(self.fruit)
-        if self.fruit is not None:
-            if self.pacman.collideCheck(self.fruit):
-                self.updateScore(self.fruit.points)
-                self.textgroup.addText(str(self.fruit.points), WHITE, self.fruit.position.x, self.fruit.position.y, 8, time=1)
-                fruitCaptured = False
-                for fruit in self.fruitCaptured:
-                    if fruit.get_offset() == self.fruit.image.get_offset():
-                        fruitCaptured = True
-                        break
-                if not fruitCaptured:
-                    self.fruitCaptured.append(self.fruit.image)
-                self.fruit = None
-            elif self.fruit.destroy:
-                self.fruit = None
-
-    def showEntities(self):
-        """
-        Shows Pacman and ghosts.
-        """
-        self.pacman.visible = True
-        self.ghosts.show()
-
-    def hideEntities(self):
-        """
-        Hides Pacman and ghosts.
-        """
-        self.pacman.visible = False
-        self.ghosts.hide()
+                    if self.replay is not None:
+                        self.replay.addToggle()  # Record the pause for the next tick
+                    paused = self.togglePause()
+                    if paused is False:
+                        self.textgroup.hideText()
+                    elif paused:
+                        self.textgroup.showText(PAUSETXT)
+                        # self.hideEntities()
+                elif event.key == K_d:
+                    self.dirtyRender = not self.dirtyRender
+                    self.dirtyBackground = None
+
+    def saveReplay(self):
+        """
+        Saves the recorded inputs, if the game is being recorded.
+        """
+        if self.replay is not None:
+            self.replay.setResult(self)
+            self.replay.save(self.replayPath)
+
+    def powerPelletEaten(self):
+        """
+        Plays the power pellet sound.
+        """
+        self.sounds.play("powerpellet")
+
+    def ghostEaten(self, ghost):
+        """
+        Plays the sound and shows the points for an eaten ghost.
+        """
+        self.sounds.play("eatghost")
+        self.textgroup.addText(str(ghost.points), WHITE, ghost.position.x, ghost.position.y, 8, time=1)
+
+    def pacmanDied(self):
+        """
+        Plays the death sound and removes a life icon.
+        """
+        self.lifesprites.removeImage()
+        self.sounds.play("death")
+
+    def gameOver(self):
+        """
+        Stops the music and shows the game over text.
+        """
+        pygame.mixer.music.stop()
+        self.textgroup.showText(GAMEOVERTXT)
+
+    def fruitEaten(self, fruit):
+        """
+        Shows the points for the eaten fruit and adds it to the captured fruit HUD.
+        """
+        self.textgroup.addText(str(fruit.points), WHITE, fruit.position.x, fruit.position.y, 8, time=1)
+        fruitCaptured = False
+        for image in self.fruitCaptured:
+            if image.get_offset() == fruit.image.get_offset():
+                fruitCaptured = True
+                break
+        if not fruitCaptured:
+            self.fruitCaptured.append(fruit.image)
+
+    def levelCompleted(self):
+        """
+        Starts flashing the background.
+        """
+        self.flashBG = True
 
     def nextLevel(self):
         """
         Starts the next level.
         """
-        self.showEntities()
-        self.level += 1
-        self.pause.paused = True
-        self.startGame()
+        Simulation.nextLevel(self)
         self.textgroup.updateLevel(self.level)
 
     def restartGame(self):
@@ -376,12 +411,7 @@ class GameController(object):
         """
         # pygame.mixer.music.load("Pacman_NgThienBao/BUONGDOITAYNHAURA.mp3")
         self.startScreen2()
-        self.lives = 8
-        self.level = 0
-        self.pause.paused = True
-        self.fruit = None
-        self.startGame()
-        self.score = 0
+        Simulation.restartGame(self)
         self.textgroup.updateScore(self.score)
         self.textgroup.updateLevel(self.level)
         self.textgroup.showText(READYTXT)
@@ -392,53 +422,107 @@ class GameController(object):
         """
         Resets the current level.
         """
-        self.pause.paused = True
-        self.pacman.reset()
-        self.ghosts.reset()
-        self.fruit = None
+        Simulation.resetLevel(self)
         self.textgroup.showText(READYTXT)
 
     def updateScore(self, points):
         """
         Updates the player's score.
         """
-        self.score += points
+        Simulation.updateScore(self, points)
         self.textgroup.updateScore(self.score)
 
     def render(self):
         """
         Renders game objects to the screen.
         """
+        if self.dirtyRender and self.background is self.dirtyBackground:
+            self.renderDirty()
+        else:
+            self.renderFull()
+
+    def renderFull(self):
+        """
+        Redraws the whole screen from the background.
+        """
         self.screen.blit(self.background, (0, 0))
         # self.nodes.render(self.screen)
         self.pellets.render(self.screen)
-        if self.fruit is not None:
-            self.fruit.render(self.screen)
-        self.pacman.render(self.screen)
-        self.ghosts.render(self.screen)
-        self.textgroup.render(self.screen)
+        self.drawn = self.renderScene()
+        self.dirtyBackground = self.background
+        pygame.display.update()
+
+    def renderDirty(self):
+        """
+        Redraws only the areas of the screen that changed since the last frame.
+        Everything drawn over the maze last frame is erased from the background,
+        the pellets under it are redrawn and the scene is drawn again. Only the
+        areas whose contents moved or changed are passed to the display.
+        """
+        pelletRects = self.pellets.getDirtyRects()
+        erased = [rect for surface, rect in self.drawn] + pelletRects
+        for rect in erased:
+            self.screen.blit(self.background, rect, rect)
+        self.pellets.renderArea(self.screen, erased)
+        drawn = self.renderScene()
+
+        before = set((surface, tuple(rect)) for surface, rect in self.drawn)
+        after = set((surface, tuple(rect)) for surface, rect in drawn)
+        dirty = [pygame.Rect(rect) for surface, rect in before ^ after] + pelletRects
+        self.drawn = drawn
+        pygame.display.update(dirty)
+
+    def renderScene(self):
+        """
+        Draws the fruit, Pacman, ghosts, text and HUD over the maze.
+
+        Returns:
+            list: The (surface, rect) pairs that were drawn.
+        """
+        drawn = []
+        for entity in self.getEntities():
+            rect = entity.render(self.screen, self.alpha)
+            if rect is not None:
+                drawn.append((entity.image, rect))
+        if self.crowd is not None:
+            drawn.extend(self.crowd.render(self.screen, self.alpha))
+
+        for text in list(self.textgroup.alltext.values()):
+            rect = text.render(self.screen)
+            if rect is not None:
+                drawn.append((text.label, rect))
 
         for i in range(len(self.lifesprites.images)):
             x = self.lifesprites.images[i].get_width() * i
             y = SCREENHEIGHT - self.lifesprites.images[i].get_height()
-            self.screen.blit(self.lifesprites.images[i], (x, y))
+            drawn.append((self.lifesprites.images[i], self.screen.blit(self.lifesprites.images[i], (x, y))))
 
         for i in range(len(self.fruitCaptured)):
             x = SCREENWIDTH - self.fruitCaptured[i].get_width() * (i + 1)
             y = SCREENHEIGHT - self.fruitCaptured[i].get_height()
-            self.screen.blit(self.fruitCaptured[i], (x, y))
+            drawn.append((self.fruitCaptured[i], self.screen.blit(self.fruitCaptured[i], (x, y))))
 
-        pygame.display.update()
+        return drawn
 
 
 if __name__ == "__main__":
     """
     Main function to run the game.
     """
-    game = GameController()
+    import argparse
+    parser = argparse.ArgumentParser(description="Play Pacman.")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the random generator")
+    parser.add_argument("--record", default=None, help="file to record the inputs to, saved when the window is closed")
+    parser.add_argument("--replay", default=None, help="replay file to play back headlessly at full speed")
+    args = parser.parse_args()
+    if args.replay is not None:
+        exit(verifyReplay(args.replay))
+
+    game = GameController(seed=args.seed, replayPath=args.record)
     game.startScreen()
     game.startScreen2()
     game.startGame()
 
     while game.running:
-        game.update()
\ No newline at end of file
+        game.update()
+    game.close()
\ No newline at end of file
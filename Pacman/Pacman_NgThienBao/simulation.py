@@ -0,0 +1,614 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from constants import *
+from pacman import Pacman
+from nodes import NodeGroup
+from pellets import PelletGroup
+from ghosts import GhostGroup
+from crowd import GhostCrowd
+from spatial import SpatialHash
+from fruit import Fruit
+from pauser import Pause
+from mazedata import MazeData
+from sprites import NullSprites
+from gamerandom import GameRandom
+
+class Level(object):
+    """
+    The objects making up one level. A level is built apart from the running game,
+    so the next one can be prepared on a worker thread while the current one ends.
+
+    Attributes:
+        number (int): The level number.
+        maze (object): The maze object of the level from MazeData.
+        nodes (NodeGroup): The node graph, with portals, home nodes and access rules.
+        pacman (Pacman): Pacman, placed on the start node.
+        pellets (PelletGroup): The pellets of the maze.
+        ghosts (GhostGroup): The ghosts, placed on their start nodes.
+        crowd (GhostCrowd): The extra ghosts of the crowd mode, or None.
+        collisions (SpatialHash): The ghosts and the fruit by the edge they are on, keyed by name.
+    """
+
+    def __init__(self, number):
+        """
+        Initializes an empty Level object.
+
+        Args:
+            number (int): The level number.
+        """
+        self.number = number
+        self.maze = None
+        self.nodes = None
+        self.pacman = None
+        self.pellets = None
+        self.ghosts = None
+        self.crowd = None
+        self.collisions = None
+
+
+class GameState(object):
+    """
+    A snapshot of everything in a game that changes as it runs, taken by
+    Simulation.snapshot and put back by Simulation.restore. The numbers are kept
+    in flat arrays and the objects that never change, such as the node graph and
+    the pellets themselves, are shared with the game rather than copied.
+
+    Attributes:
+        level (Level): The level being played.
+        values (numpy.ndarray): The score, lives, level number, high score, pause and fruit
+            timers, then the state of Pacman and of each ghost.
+        pellets (numpy.ndarray): The pellets left, as a bitset.
+        access (numpy.ndarray): The access rules of the node graph.
+        crowd (tuple): The state of the crowd, or None.
+        rng (tuple): The state of the random generator.
+        fruit (Fruit): The fruit, or None.
+        pauseFunc (function): The method called when the pause ends, or None.
+        extra (object): The state subclasses of Simulation keep with the snapshot.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty GameState object.
+        """
+        self.level = None
+        self.values = None
+        self.pellets = None
+        self.access = None
+        self.crowd = None
+        self.rng = None
+        self.fruit = None
+        self.pauseFunc = None
+        self.extra = None
+
+
+class Simulation(object):
+    """
+    The game logic without any rendering, audio or keyboard input.
+    Pacman's direction is passed in to update, so the game can run on a server
+    without a window as fast as the machine allows. GameController extends it
+    with the display, text, sound and HUD through the event methods.
+
+    Attributes:
+        headless (bool): Flag indicating whether the game runs without a display.
+        fruit (Fruit): The fruit object, if present.
+        pause (Pause): The pause object for handling game pauses.
+        level (int): The current game level.
+        lives (int): The number of remaining lives.
+        score (int): The player's current score.
+        high_score (int): The highest score achieved.
+        fruitNode (Node): The node where the fruit spawns.
+        currentLevel (Level): The level being played.
+        mazedata (MazeData): The data object containing information about the maze.
+        preload (bool): Flag indicating whether the next level is built in the background
+            while the level-complete pause runs.
+        loader (ThreadPoolExecutor): The worker thread building preloaded levels, None until the first preload.
+        preloading (tuple): The (level number, Future) of the level being preloaded, or None.
+        crowdSize (int): The number of extra ghosts in the crowd mode, 0 to play without a crowd.
+        crowd (GhostCrowd): The extra ghosts of the current level, or None.
+        collisions (SpatialHash): The ghosts and the fruit of the current level by the edge they are on.
+        rng (GameRandom): The random generator of the game, shared by every entity.
+    """
+
+    def __init__(self, headless=True, crowdSize=0, seed=None):
+        """
+        Initializes the Simulation object.
+
+        Args:
+            headless (bool): Whether the game runs without a display. Headless games
+                skip sprite animation and start without waiting for the player.
+            crowdSize (int): The number of extra ghosts to add to every level.
+            seed (int): The seed of the random generator, None to pick one.
+        """
+        self.headless = headless
+        self.rng = GameRandom(seed)
+        self.fruit = None
+        self.pause = Pause(True)
+        self.level = 0
+        self.lives = 8
+        self.score = 0
+        self.high_score = 0
+        self.fruitNode = None
+        self.currentLevel = None
+        self.mazedata = MazeData()
+        self.preload = not headless
+        self.loader = None
+        self.preloading = None
+        self.crowdSize = crowdSize
+        self.crowd = None
+        self.collisions = None
+
+    def startGame(self):
+        """
+        Initializes a new game level, using the preloaded level if it is ready.
+        """
+        self.setLevel(self.getLevel(self.level))
+        self.removeSprites([self.pacman] + list(self.ghosts))
+        if self.headless and self.crowd is not None:
+            self.crowd.sprites = None
+        self.waitForStart()
+
+    def buildLevel(self, number):
+        """
+        Builds a level without touching the running game, so it is safe to call
+        from the loader thread.
+
+        Args:
+            number (int): The level number.
+
+        Returns:
+            Level: The new level.
+        """
+        level = Level(number)
+        mazedata = MazeData()
+        mazedata.loadMaze(number)
+        level.maze = maze = mazedata.obj
+        level.nodes = nodes = NodeGroup("Pacman_NgThienBao/" + maze.name + ".txt")
+        maze.setPortalPairs(nodes)
+        maze.connectHomeNodes(nodes)
+        level.pacman = pacman = Pacman(nodes.getNodeFromTiles(*maze.pacmanStart), self.rng)
+        level.pellets = PelletGroup("Pacman_NgThienBao/" + maze.name + ".txt")
+        level.ghosts = ghosts = GhostGroup(nodes.getStartTempNode(), pacman, self.rng)
+        ghosts.pinky.setStartNode(nodes.getNodeFromTiles(*maze.addOffset(2, 3)))
+        ghosts.inky.setStartNode(nodes.getNodeFromTiles(*maze.addOffset(0, 3)))
+        ghosts.clyde.setStartNode(nodes.getNodeFromTiles(*maze.addOffset(4, 3)))
+        ghosts.setSpawnNode(nodes.getNodeFromTiles(*maze.addOffset(2, 3)))
+        ghosts.blinky.setStartNode(nodes.getNodeFromTiles(*maze.addOffset(2, 0)))
+        nodes.denyHomeAccess(pacman)
+        nodes.denyHomeAccessList(ghosts)
+        ghosts.inky.startNode.denyAccess(RIGHT, ghosts.inky)
+        ghosts.clyde.startNode.denyAccess(LEFT, ghosts.clyde)
+        maze.denyGhostsAccess(ghosts, nodes)
+        level.collisions = SpatialHash(nodes)
+        if self.crowdSize > 0:
+            level.crowd = GhostCrowd(nodes, pacman, ghosts, self.crowdSize, self.rng)
+        return level
+
+    def preloadLevel(self, number):
+        """
+        Starts building a level on the loader thread.
+
+        Args:
+            number (int): The level number.
+        """
+        self.preloading = (number, self.getLoader().submit(self.buildLevel, number))
+
+    def getLoader(self):
+        """
+        Returns the loader thread, starting it on first use.
+
+        Returns:
+            ThreadPoolExecutor: The loader.
+        """
+        if self.loader is None:
+            self.loader = ThreadPoolExecutor(max_workers=1)
+        return self.loader
+
+    def close(self):
+        """
+        Stops the loader thread, if it was started, once its last level is built.
+        """
+        if self.loader is not None:
+            self.loader.shutdown(wait=True)
+            self.loader = None
+        self.preloading = None
+
+    def getLevel(self, number):
+        """
+        Returns a level, waiting for the loader thread if it is building that level
+        and building it here otherwise.
+
+        Args:
+            number (int): The level number.
+
+        Returns:
+            Level: The level.
+        """
+        if self.preloading is not None:
+            preloaded, future = self.preloading
+            self.preloading = None
+            if preloaded == number:
+                return future.result()
+        return self.buildLevel(number)
+
+    def setLevel(self, level):
+        """
+        Swaps a level into the game.
+
+        Args:
+            level (Level): The level to play.
+        """
+        self.currentLevel = level
+        self.mazedata.obj = level.maze
+        self.nodes = level.nodes
+        self.pacman = level.pacman
+        self.pellets = level.pellets
+        self.ghosts = level.ghosts
+        self.crowd = level.crowd
+        self.collisions = level.collisions
+
+    def removeSprites(self, entities):
+        """
+        Replaces the sprites of the entities with NullSprites when running headless.
+
+        Args:
+            entities (list): The entities to update.
+        """
+        if self.headless:
+            for entity in entities:
+                entity.sprites = NullSprites()
+
+    def waitForStart(self):
+        """
+        Pauses the game until the player starts it. Headless games start at once.
+        """
+        self.pause.paused = not self.headless
+
+    def update(self, dt, direction=STOP):
+        """
+        Advances the game by one frame.
+
+        Args:
+            dt (float): The time elapsed since the last update.
+            direction (int): The direction requested for Pacman this frame.
+        """
+        self.pellets.update(dt)
+        if not self.pause.paused:
+            self.ghosts.update(dt)
+            if self.crowd is not None:
+                self.crowd.update(dt)
+            if self.fruit is not None:
+                self.fruit.update(dt)
+            self.trackEntities()
+            self.checkPelletEvents()
+            self.checkGhostEvents()
+            self.checkFruitEvents()
+
+        if self.pacman.alive:
+            if not self.pause.paused:
+                self.pacman.update(dt, direction)
+        else:
+            self.pacman.update(dt, direction)
+
+        afterPauseMethod = self.pause.update(dt)
+        if afterPauseMethod is not None:
+            afterPauseMethod()
+
+    def togglePause(self):
+        """
+        Pauses or resumes the game for the player, while Pacman is alive.
+
+        Returns:
+            bool or None: Whether the game is now paused, or None if nothing changed.
+        """
+        if self.pacman.alive:
+            self.pause.setPause(playerPaused=True)
+            if not self.pause.paused:
+                self.showEntities()
+            return self.pause.paused
+        return None
+
+    def snapshot(self):
+        """
+        Captures the state of the game, for search agents that try many moves from
+        one position. Sprites, animations and the display are not captured.
+
+        Returns:
+            GameState: The state.
+        """
+        state = GameState()
+        state.level = self.currentLevel
+        pause = self.pause
+        fruit = self.fruit
+        values = [self.score, self.lives, self.level, self.high_score, pause.paused, pause.timer,
+                  -1 if pause.pauseTime is None else pause.pauseTime,
+                  0 if fruit is None else fruit.timer, fruit is not None and fruit.destroy]
+        values += self.pacman.getState()
+        for ghost in self.ghosts:
+            values += ghost.getState()
+        state.values = np.array(values, dtype=np.float64)
+        state.pellets = self.pellets.getState()
+        state.access = self.nodes.getAccessState()
+        if self.crowd is not None:
+            state.crowd = self.crowd.getState()
+        state.rng = self.rng.getState()
+        state.fruit = fruit
+        state.pauseFunc = pause.func
+        state.extra = self.snapshotExtra()
+        return state
+
+    def restore(self, state):
+        """
+        Puts the game back in a state returned by snapshot. The state can be restored
+        any number of times, and is not changed by the game running on from it.
+
+        Args:
+            state (GameState): The state.
+        """
+        if state.level is not self.currentLevel:
+            self.setLevel(state.level)
+        values = state.values.tolist()
+        self.score, self.lives, self.level, self.high_score = [int(value) for value in values[:4]]
+        pause = self.pause
+        pause.paused = bool(values[4])
+        pause.timer = values[5]
+        pause.pauseTime = None if values[6] < 0 else values[6]
+        pause.func = state.pauseFunc
+        self.fruit = state.fruit
+        if self.fruit is not None:
+            self.fruit.timer = values[7]
+            self.fruit.destroy = bool(values[8])
+        start = self.pacman.setState(values, 9)
+        for ghost in self.ghosts:
+            start = ghost.setState(values, start)
+        self.pellets.setState(state.pellets)
+        self.nodes.setAccessState(state.access)
+        if state.crowd is not None:
+            self.crowd.setState(state.crowd)
+        self.rng.setState(state.rng)
+        self.trackEntities()
+        self.restoreExtra(state.extra)
+
+    def snapshotExtra(self):
+        """
+        Called by snapshot to capture the state a subclass adds to the game.
+
+        Returns:
+            object: The state, copied so the game running on does not change it.
+        """
+        return None
+
+    def restoreExtra(self, extra):
+        """
+        Called by restore to put back the state returned by snapshotExtra.
+
+        Args:
+            extra (object): The state.
+        """
+        pass
+
+    def checkPelletEvents(self):
+        """
+        Checks for Pacman eating pellets and power pellets.
+        """
+        pellet = self.pacman.eatPellets(self.pellets)
+        if pellet:
+            self.pellets.removePellet(pellet)
+            self.pelletEaten(pellet)
+            self.updateScore(pellet.points)
+            if self.pellets.numEaten == 30:
+                self.ghosts.inky.startNode.allowAccess(RIGHT, self.ghosts.inky)
+            if self.pellets.numEaten == 70:
+                self.ghosts.clyde.startNode.allowAccess(LEFT, self.ghosts.clyde)
+            if pellet.name == POWERPELLET:
+                self.powerPelletEaten()
+                self.ghosts.startFreight()
+                if self.crowd is not None:
+                    self.crowd.startFreight()
+            if self.pellets.isEmpty():
+                if self.preload:
+                    self.preloadLevel(self.level + 1)
+                self.levelCompleted()
+                self.hideEntities()
+                self.pause.setPause(pauseTime=3, func=self.nextLevel)
+
+    def trackEntities(self):
+        """
+        Moves the ghosts and the fruit to the buckets of the edges they are on.
+        """
+        for ghost in self.ghosts:
+            self.collisions.move(ghost.name, ghost.node.id, ghost.target.id)
+        if self.fruit is not None:
+            self.collisions.move(FRUIT, self.fruit.node.id, self.fruit.target.id)
+        else:
+            self.collisions.remove(FRUIT)
+
+    def checkGhostEvents(self):
+        """
+        Checks for Pacman colliding with the ghosts near him.
+        """
+        nearby = self.collisions.nearby(self.pacman.position)
+        for ghost in self.ghosts:
+            if ghost.name in nearby and self.pacman.collideGhost(ghost):
+                if ghost.mode.current is FREIGHT:
+                    self.pacman.visible = False
+                    ghost.visible = False
+                    self.updateScore(ghost.points)
+                    self.ghostEaten(ghost)
+                    self.ghosts.updatePoints()
+                    self.pause.setPause(pauseTime=1, func=self.showEntities)
+                    ghost.startSpawn()
+                    self.nodes.allowHomeAccess(ghost)
+                elif ghost.mode.current is not SPAWN:
+                    self.killPacman()
+        if self.crowd is not None:
+            self.checkCrowdEvents()
+
+    def checkCrowdEvents(self):
+        """
+        Checks for Pacman colliding with the ghosts of the crowd. Eating one of them
+        scores without pausing the game, as there can be hundreds.
+        """
+        for i in self.crowd.collide(self.pacman.position, self.pacman.collideRadius):
+            if self.crowd.modes[i] == FREIGHT:
+                self.updateScore(self.crowd.points)
+                self.crowd.points = min(self.crowd.points * 2, 1600)
+                self.crowd.startSpawn(i)
+            elif self.crowd.modes[i] != SPAWN:
+                self.killPacman()
+
+    def killPacman(self):
+        """
+        Takes a life when a ghost catches Pacman, and ends the game on the last one.
+        """
+        if self.pacman.alive:
+            self.lives -= 1
+            self.pacman.die()
+            self.ghosts.hide()
+            if self.crowd is not None:
+                self.crowd.visible = False
+            self.pacmanDied()
+            if self.lives <= 0:
+                self.high_score = max(self.score, self.high_score)
+                self.gameOver()
+                self.pause.setPause(pauseTime=3, func=self.restartGame)
+            else:
+                self.pause.setPause(pauseTime=3, func=self.resetLevel)
+
+    def checkFruitEvents(self):
+        """
+        Checks for Pacman eating the fruit.
+        """
+        if self.pellets.numEaten == 50 or self.pellets.numEaten == 140:
+            if self.fruit is None:
+                self.fruit = Fruit(self.nodes.getNodeFromTiles(9, 20), self.level, self.rng)
+                self.removeSprites([self.fruit])
+                self.trackEntities()
+        if self.fruit is not None:
+            if FRUIT in self.collisions.nearby(self.pacman.position) and self.pacman.collideCheck(self.fruit):
+                self.updateScore(self.fruit.points)
+                self.fruitEaten(self.fruit)
+                self.fruit = None
+            elif self.fruit.destroy:
+                self.fruit = None
+
+    def pelletEaten(self, pellet):
+        """
+        Called when Pacman eats a pellet or a power pellet.
+
+        Args:
+            pellet (Pellet): The pellet that was eaten.
+        """
+        pass
+
+    def powerPelletEaten(self):
+        """
+        Called when Pacman eats a power pellet.
+        """
+        pass
+
+    def ghostEaten(self, ghost):
+        """
+        Called when Pacman eats a ghost in Freight mode.
+
+        Args:
+            ghost (Ghost): The ghost that was eaten.
+        """
+        pass
+
+    def pacmanDied(self):
+        """
+        Called when a ghost catches Pacman.
+        """
+        pass
+
+    def gameOver(self):
+        """
+        Called when Pacman loses the last life.
+        """
+        pass
+
+    def fruitEaten(self, fruit):
+        """
+        Called when Pacman eats the fruit.
+
+        Args:
+            fruit (Fruit): The fruit that was eaten.
+        """
+        pass
+
+    def levelCompleted(self):
+        """
+        Called when the last pellet of the level is eaten.
+        """
+        pass
+
+    def getEntities(self):
+        """
+        Returns the fruit (if present), Pacman and the ghosts.
+
+        Returns:
+            list: The moving entities in drawing order.
+        """
+        entities = [self.pacman] + list(self.ghosts)
+        if self.fruit is not None:
+            entities.insert(0, self.fruit)
+        return entities
+
+    def showEntities(self):
+        """
+        Shows Pacman and ghosts.
+        """
+        self.pacman.visible = True
+        self.ghosts.show()
+        if self.crowd is not None:
+            self.crowd.visible = True
+
+    def hideEntities(self):
+        """
+        Hides Pacman and ghosts.
+        """
+        self.pacman.visible = False
+        self.ghosts.hide()
+        if self.crowd is not None:
+            self.crowd.visible = False
+
+    def nextLevel(self):
+        """
+        Starts the next level.
+        """
+        self.showEntities()
+        self.level += 1
+        self.startGame()
+
+    def restartGame(self, level=0):
+        """
+        Restarts the game from the beginning.
+
+        Args:
+            level (int): The level to start from.
+        """
+        self.lives = 8
+        self.level = level
+        self.fruit = None
+        self.startGame()
+        self.score = 0
+
+    def resetLevel(self):
+        """
+        Resets the current level.
+        """
+        self.pacman.reset()
+        self.ghosts.reset()
+        if self.crowd is not None:
+            self.crowd.reset()
+        self.fruit = None
+        self.waitForStart()
+
+    def updateScore(self, points):
+        """
+        Updates the player's score.
+
+        Args:
+            points (int): The points to add.
+        """
+        self.score += points
@@ -0,0 +1,60 @@
+import pygame
+
+SOUNDFILES = {"powerpellet":"Pacman_NgThienBao/WAKUWAKU.mp3",
+              "eatghost":"Pacman_NgThienBao/WAKUWAKU.mp3",
+              "death":"Pacman_NgThienBao/WAKUWAKU.mp3"}
+
+class SoundBank(object):
+    """A class holding the decoded sound effects of the game.
+
+    Effects are decoded once when the bank is created, so playing one during the
+    game never reads or decodes a file.
+
+    Attributes:
+        sounds (dict): The decoded sounds, keyed by effect name.
+        channels (list): The mixer channels reserved for effects.
+        nextchannel (int): The index of the channel used for the next effect.
+    """
+
+    def __init__(self, soundfiles=SOUNDFILES, numchannels=4):
+        """Initialize the SoundBank object.
+
+        Args:
+            soundfiles (dict): The file paths of the effects, keyed by effect name.
+            numchannels (int): The number of mixer channels reserved for effects.
+        """
+        self.sounds = {}
+        self.channels = []
+        self.nextchannel = 0
+        if pygame.mixer.get_init() is not None:
+            self.load(soundfiles)
+            if pygame.mixer.get_num_channels() < numchannels:
+                pygame.mixer.set_num_channels(numchannels)
+            pygame.mixer.set_reserved(numchannels)
+            self.channels = [pygame.mixer.Channel(i) for i in range(numchannels)]
+
+    def load(self, soundfiles):
+        """Decode the sound files into memory.
+
+        Files shared by several effects are only decoded once.
+
+        Args:
+            soundfiles (dict): The file paths of the effects, keyed by effect name.
+        """
+        decoded = {}
+        for name, path in soundfiles.items():
+            if path not in decoded:
+                decoded[path] = pygame.mixer.Sound(path)
+            self.sounds[name] = decoded[path]
+
+    def play(self, name):
+        """Play an effect on the next channel of the pool.
+
+        Args:
+            name (str): The name of the effect.
+        """
+        if name not in self.sounds or len(self.channels) == 0:
+            return
+        channel = self.channels[self.nextchannel]
+        self.nextchannel = (self.nextchannel + 1) % len(self.channels)
+        channel.play(self.sounds[name])
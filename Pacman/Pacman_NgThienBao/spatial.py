@@ -0,0 +1,165 @@
+import hashlib
+import numpy as np
+from constants import *
+
+EMPTY = frozenset()
+# Các ô xung quanh một ô, kể cả chính nó
+AROUND = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+# Bảng cạnh theo ô của mỗi đồ thị, theo mã băm của đồ thị
+tileTables = {}
+
+
+class SpatialHash(object):
+    """
+    A uniform grid keyed by tile for finding the entities close to a point, so
+    collision checks only look at the entities near Pacman.
+
+    Entities are kept in buckets by the edge they move along, the pair of nodes
+    they come from and head to, and only change bucket when that edge changes.
+    Every tile lists the edges passing through it or the eight tiles around it,
+    so an entity touching a point in a tile is in the bucket of one of the edges
+    listed for that tile. Along a corridor a tile lists a single edge, and only
+    the entities on that same edge are candidates.
+
+    The grid is built from the node graph as it is when the hash is created, and
+    collision radii must add up to less than a tile. Grids are kept in tileTables,
+    keyed by a hash of the node positions and links, so every level on the same
+    maze shares one grid and starts with empty buckets.
+
+    Attributes:
+        numNodes (int): The number of nodes in the graph.
+        tileEdges (dict): The edges near each (col, row) tile, shared by every hash of the same graph.
+        buckets (dict): The keys of the entities on each edge.
+        edges (dict): The edge each key is on.
+    """
+
+    def __init__(self, nodes):
+        """
+        Initializes a SpatialHash object.
+
+        Args:
+            nodes (NodeGroup): The node graph of the level.
+        """
+        self.numNodes = n = nodes.numNodes
+        self.buckets = {}
+        self.edges = {}
+        digest = hashlib.sha1(nodes.positions[:n].tobytes() + nodes.neighborIds[:n, :4].tobytes()).hexdigest()
+        if digest not in tileTables:
+            tileTables[digest] = self.buildTileEdges(nodes)
+        self.tileEdges = tileTables[digest]
+
+    def buildTileEdges(self, nodes):
+        """
+        Lists the edges near each tile of a node graph.
+
+        Args:
+            nodes (NodeGroup): The node graph.
+
+        Returns:
+            dict: The edge codes near each (col, row) tile.
+        """
+        n = self.numNodes
+        tileEdges = {}
+        starts, ends = np.nonzero(nodes.neighborIds[:n, :4] >= 0)
+        ends = nodes.neighborIds[starts, ends]
+        # Mỗi nút cũng là một cạnh, cho các thực thể đứng yên trên nút
+        starts = np.concatenate([starts, np.arange(n)])
+        ends = np.concatenate([ends, np.arange(n)])
+        codes = np.unique(self.getEdges(starts, ends))
+        if len(codes) == 0:
+            return tileEdges
+        tiles = nodes.positions[:n] // (TILEWIDTH, TILEHEIGHT)
+        first, last = tiles[codes // n], tiles[codes % n]
+        lengths = np.abs(last - first).max(axis=1) + 1
+        owners = np.repeat(np.arange(len(codes)), lengths)
+        steps = np.arange(len(owners)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        cells = first[owners] + np.sign(last - first)[owners] * steps[:, None]
+        cells = (cells[:, None, :] + AROUND[None, :, :]).reshape(-1, 2)
+        owners = np.repeat(owners, len(AROUND))
+        pairs = np.unique(np.column_stack((cells, codes[owners])), axis=0)
+        split = np.nonzero(np.any(pairs[1:, :2] != pairs[:-1, :2], axis=1))[0] + 1
+        for group in np.split(pairs, split):
+            col, row = group[0, :2].tolist()
+            tileEdges[(col, row)] = tuple(group[:, 2].tolist())
+        return tileEdges
+
+    def getEdges(self, nodeIds, targetIds):
+        """
+        Returns the codes of the edges between nodes, the same both ways.
+
+        Args:
+            nodeIds (numpy.ndarray): The ids of the nodes the entities come from.
+            targetIds (numpy.ndarray): The ids of the nodes they head to.
+
+        Returns:
+            numpy.ndarray: The edge codes.
+        """
+        return np.minimum(nodeIds, targetIds).astype(np.int64) * self.numNodes + np.maximum(nodeIds, targetIds)
+
+    def move(self, key, nodeId, targetId):
+        """
+        Puts an entity in the bucket of the edge it is on, if that edge changed.
+
+        Args:
+            key (hashable): The key of the entity.
+            nodeId (int): The id of the node the entity comes from.
+            targetId (int): The id of the node the entity heads to.
+        """
+        if nodeId > targetId:
+            nodeId, targetId = targetId, nodeId
+        edge = nodeId * self.numNodes + targetId
+        old = self.edges.get(key)
+        if old != edge:
+            if old is not None:
+                self.buckets[old].discard(key)
+            self.edges[key] = edge
+            self.buckets.setdefault(edge, set()).add(key)
+
+    def moveMany(self, keys, nodeIds, targetIds):
+        """
+        Moves several entities, as move does for one.
+
+        Args:
+            keys (list): The keys of the entities.
+            nodeIds (numpy.ndarray): The ids of the nodes the entities come from.
+            targetIds (numpy.ndarray): The ids of the nodes they head to.
+        """
+        edges, buckets = self.edges, self.buckets
+        for key, edge in zip(keys, self.getEdges(nodeIds, targetIds).tolist()):
+            old = edges.get(key)
+            if old != edge:
+                if old is not None:
+                    buckets[old].discard(key)
+                edges[key] = edge
+                buckets.setdefault(edge, set()).add(key)
+
+    def remove(self, key):
+        """
+        Takes an entity out of the hash, if it is in it.
+
+        Args:
+            key (hashable): The key of the entity.
+        """
+        edge = self.edges.pop(key, None)
+        if edge is not None:
+            self.buckets[edge].discard(key)
+
+    def nearby(self, position):
+        """
+        Finds the entities that may be touching a point. The set returned must not be changed.
+
+        Args:
+            position (Vector2): The point.
+
+        Returns:
+            set: The keys of the entities on the edges near the point.
+        """
+        edges = self.tileEdges.get((int(position.x // TILEWIDTH), int(position.y // TILEHEIGHT)), ())
+        if len(edges) == 1:
+            return self.buckets.get(edges[0], EMPTY)
+        found = set()
+        for edge in edges:
+            bucket = self.buckets.get(edge)
+            if bucket:
+                found |= bucket
+        return found
@@ -1,24 +1,146 @@
 
+import os
+import threading
 import pygame
-import numpy as np
+from mazecompiler import loadMaze
 from animation import Animator
 from constants import *
 
 BASETILEWIDTH = 16
 BASETILEHEIGHT = 16
 DEATH = 5
+SPRITESHEET = "Pacman_NgThienBao/spritesheet_pacman2.png"
 
-class Spritesheet(object):
-    """A class representing a spritesheet"""
+class SpritesheetAtlas(object):
+    """A class representing the spritesheet image loaded and scaled to the tile size.
 
-    def __init__(self):
-        """Initialize the Spritesheet object."""
-        self.sheet = pygame.image.load("Pacman_NgThienBao/spritesheet_pacman2.png").convert()
+    Decoding the PNG and rescaling the whole sheet is expensive, so one atlas is
+    shared by every sprite class through getAtlas. Sliced images are cached in
+    frames and rotated images in rotations, so each image is only cut out of the
+    sheet and rotated once.
+    """
+
+    def __init__(self, filename, sheet=None):
+        """Load the spritesheet and scale it to the current tile size.
+
+        Args:
+            filename (str): The file path of the spritesheet image.
+            sheet (pygame.Surface): An already scaled sheet to use instead of loading the file.
+        """
+        self.filename = filename
+        self.frames = {}
+        self.rotations = {}
+        if sheet is not None:
+            self.sheet = sheet
+            return
+        self.sheet = pygame.image.load(filename)
+        if pygame.display.get_surface() is not None:
+            self.sheet = self.sheet.convert()
         transcolor = self.sheet.get_at((0,0))
         self.sheet.set_colorkey(transcolor)
         width = int(self.sheet.get_width() / BASETILEWIDTH * TILEWIDTH)
         height = int(self.sheet.get_height() / BASETILEHEIGHT * TILEHEIGHT)
         self.sheet = pygame.transform.scale(self.sheet, (width, height))
+
+    def copy(self):
+        """Make an atlas over a copy of the sheet, with empty caches.
+
+        Returns:
+            SpritesheetAtlas: The new atlas.
+        """
+        return SpritesheetAtlas(self.filename, self.sheet.copy())
+
+    def getImage(self, x, y, width, height):
+        """Get a specific image from the spritesheet, slicing it on first use.
+
+        Args:
+            x (int): The x-coordinate of the top-left corner of the image in tiles.
+            y (int): The y-coordinate of the top-left corner of the image in tiles.
+            width (int): The width of the image.
+            height (int): The height of the image.
+
+        Returns:
+            pygame.Surface: The image from the spritesheet.
+        """
+        key = (x, y, width, height)
+        if key not in self.frames:
+            self.frames[key] = self.sheet.subsurface(pygame.Rect(x*TILEWIDTH, y*TILEHEIGHT, width, height))
+        return self.frames[key]
+
+    def getRotatedImage(self, x, y, width, height, rotation):
+        """Get a specific image from the spritesheet rotated by quarter turns, rotating it on first use.
+
+        Args:
+            x (int): The x-coordinate of the top-left corner of the image in tiles.
+            y (int): The y-coordinate of the top-left corner of the image in tiles.
+            width (int): The width of the image.
+            height (int): The height of the image.
+            rotation (int): The rotation in multiples of 90 degrees.
+
+        Returns:
+            pygame.Surface: The rotated image.
+        """
+        if rotation % 4 == 0:
+            return self.getImage(x, y, width, height)
+        key = (x, y, width, height, rotation % 4)
+        if key not in self.rotations:
+            self.rotations[key] = pygame.transform.rotate(self.getImage(x, y, width, height), rotation*90)
+        return self.rotations[key]
+
+
+atlases = {}
+backgrounds = {}
+# Các atlas riêng của luồng tải màn, để luồng đó không dùng tới sheet chung
+threadAtlases = threading.local()
+
+def getAtlas(filename=SPRITESHEET):
+    """Get the shared atlas for a spritesheet, loading it on first use.
+    A thread given its own atlases by setThreadAtlases gets one of those instead.
+
+    Args:
+        filename (str): The file path of the spritesheet image.
+
+    Returns:
+        SpritesheetAtlas: The atlas.
+    """
+    own = getattr(threadAtlases, "atlases", None)
+    if own is not None:
+        if filename not in own:
+            own[filename] = SpritesheetAtlas(filename)
+        return own[filename]
+    if filename not in atlases:
+        atlases[filename] = SpritesheetAtlas(filename)
+    return atlases[filename]
+
+
+def copyAtlases():
+    """Copy every shared atlas for a level loader job. Must be called on the main thread,
+    which is the only thread drawing from the shared sheets.
+
+    Returns:
+        dict: The copies, keyed by file path.
+    """
+    getAtlas()
+    return {filename: atlas.copy() for filename, atlas in atlases.items()}
+
+
+def setThreadAtlases(own):
+    """Make the current thread use its own atlases, so its sprites never read
+    the sheets the main thread draws from.
+
+    Args:
+        own (dict): The atlases from copyAtlases, or None to use the shared ones again.
+    """
+    threadAtlases.atlases = own
+
+
+class Spritesheet(object):
+    """A class representing a spritesheet"""
+
+    def __init__(self):
+        """Initialize the Spritesheet object."""
+        self.atlas = getAtlas()
+        self.sheet = self.atlas.sheet
         
     def getImage(self, x, y, width, height):
         """Get a specific image from the spritesheet.
@@ -32,10 +154,36 @@ class Spritesheet(object):
         Returns:
             pygame.Surface: The image from the spritesheet.
         """
-        x *= TILEWIDTH
-        y *= TILEHEIGHT
-        self.sheet.set_clip(pygame.Rect(x, y, width, height))
-        return self.sheet.subsurface(self.sheet.get_clip())
+        return self.atlas.getImage(x, y, width, height)
+
+    def cacheFrames(self, frames):
+        """Slice the given frames ahead of time so update only reads the cache.
+
+        Args:
+            frames (list): The (x, y) tile coordinates of the frames.
+        """
+        for frame in frames:
+            self.getImage(*frame)
+
+
+class NullSprites(object):
+    """Class standing in for the sprites of an entity when the game runs without a display."""
+
+    def update(self, dt):
+        """Do nothing, there is no image to animate.
+
+        Args:
+            dt (float): The time elapsed since the last update.
+        """
+        pass
+
+    def reset(self):
+        """Do nothing, there are no animations to reset."""
+        pass
+
+    def getStartImage(self):
+        """Get the starting image, which is None without a display."""
+        return None
 
 
 class PacmanSprites(Spritesheet):
@@ -53,6 +201,8 @@ class PacmanSprites(Spritesheet):
         self.animations = {}
         self.defineAnimations()
         self.stopimage = (8, 0)
+        for animation in self.animations.values():
+            self.cacheFrames(animation.frames)
 
     def defineAnimations(self):
         """Define the animations for Pacman's movement directions."""
@@ -121,6 +271,8 @@ class GhostSprites(Spritesheet):
         self.x = {BLINKY:0, PINKY:2, INKY:4, CLYDE:6}
         self.entity = entity
         self.entity.image = self.getStartImage()
+        x = self.x[self.entity.name]
+        self.cacheFrames([(x, 4), (x, 6), (x, 8), (x, 10), (10, 4), (8, 4), (8, 6), (8, 8), (8, 10)])
 
     def update(self, dt):
         """Update the image of the ghost entity based on its current state and direction.
@@ -167,6 +319,47 @@ class GhostSprites(Spritesheet):
         return Spritesheet.getImage(self, x, y, 2*TILEWIDTH, 2*TILEHEIGHT)
 
 
+class CrowdSprites(Spritesheet):
+    """Class holding the ghost images for a GhostCrowd, using the same frames as GhostSprites."""
+
+    def __init__(self):
+        """Initialize the CrowdSprites object."""
+        Spritesheet.__init__(self)
+        self.images = {}
+        rows = {UP:4, DOWN:6, LEFT:8, RIGHT:10, STOP:4}
+        for name, x in {BLINKY:0, PINKY:2, INKY:4, CLYDE:6}.items():
+            for direction, y in rows.items():
+                self.images[(name, SCATTER, direction)] = self.getImage(x, y)
+                self.images[(name, CHASE, direction)] = self.getImage(x, y)
+                self.images[(name, FREIGHT, direction)] = self.getImage(10, 4)
+                self.images[(name, SPAWN, direction)] = self.getImage(8, y)
+
+    def getImages(self, names, modes, directions):
+        """Get the image of every ghost of a crowd.
+
+        Args:
+            names (numpy.ndarray): The kind of each ghost.
+            modes (numpy.ndarray): The mode of each ghost.
+            directions (numpy.ndarray): The direction of each ghost.
+
+        Returns:
+            list: The image of each ghost.
+        """
+        return [self.images[key] for key in zip(names.tolist(), modes.tolist(), directions.tolist())]
+
+    def getImage(self, x, y):
+        """Get a specific image for a ghost.
+
+        Args:
+            x (int): The x-coordinate of the top-left corner of the image.
+            y (int): The y-coordinate of the top-left corner of the image.
+
+        Returns:
+            pygame.Surface: The image for the ghost.
+        """
+        return Spritesheet.getImage(self, x, y, 2*TILEWIDTH, 2*TILEHEIGHT)
+
+
 class FruitSprites(Spritesheet):
     """Class representing the sprites for the fruits."""
     
@@ -180,6 +373,7 @@ class FruitSprites(Spritesheet):
         Spritesheet.__init__(self)
         self.entity = entity
         self.fruits = {0:(16,8), 1:(18,8), 2:(20,8), 3:(16,10), 4:(18,10), 5:(20,10)}
+        self.cacheFrames(self.fruits.values())
         self.entity.image = self.getStartImage(level % len(self.fruits))
 
     def getStartImage(self, key):
@@ -247,7 +441,12 @@ class LifeSprites(Spritesheet):
 
 
 class MazeSprites(Spritesheet):
-    """Class representing the sprites for the maze."""
+    """Class representing the sprites for the maze.
+
+    Composed backgrounds are kept in the module's backgrounds dictionary, keyed by
+    the maze hash, palette row and fill colour, so restarting a level or coming
+    back to a maze never draws the same background twice.
+    """
     
     def __init__(self, mazefile, rotfile):
         """Initialize the MazeSprites object.
@@ -257,31 +456,88 @@ class MazeSprites(Spritesheet):
             rotfile (str): The file path of the rotation file.
         """
         Spritesheet.__init__(self)
-        self.data = self.readMazeFile("Pacman_NgThienBao/" + mazefile)
-        self.rotdata = self.readMazeFile("Pacman_NgThienBao/" + rotfile)
+        self.maze = loadMaze("Pacman_NgThienBao/" + mazefile, "Pacman_NgThienBao/" + rotfile)
 
-    def getImage(self, x, y):
+    def getImage(self, x, y, rotation=0):
         """Get a specific image for the maze.
         
         Args:
             x (int): The x-coordinate of the top-left corner of the image.
             y (int): The y-coordinate of the top-left corner of the image.
+            rotation (int): The rotation value in multiples of 90 degrees.
             
         Returns:
             pygame.Surface: The image for the maze.
         """
-        return Spritesheet.getImage(self, x, y, TILEWIDTH, TILEHEIGHT)
+        return self.atlas.getRotatedImage(x, y, TILEWIDTH, TILEHEIGHT, rotation)
+
+    def getBackground(self, y, color, cachedir=None):
+        """Get the background of the maze drawn in one palette row over a fill colour.
+
+        The background is shared, so callers must copy it before drawing on it.
 
-    def readMazeFile(self, mazefile):
-        """Read the maze file and return the maze data as a numpy array.
-        
         Args:
-            mazefile (str): The file path of the maze file.
-            
+            y (int): The y-coordinate of the palette row in the spritesheet.
+            color (tuple): The colour the tiles are drawn over.
+            cachedir (str): The folder to keep the background in as a PNG, or None
+                to keep it in memory only.
+
         Returns:
-            numpy.ndarray: The maze data as a numpy array.
+            pygame.Surface: The background surface.
         """
-        return np.loadtxt(mazefile, dtype='<U1')
+        if not self.hasBackground(y, color):
+            self.addBackground(y, color, self.composeBackground(y, color, cachedir))
+        return backgrounds[(self.maze.digest, y, tuple(color))]
+
+    def hasBackground(self, y, color):
+        """Check if the background for a palette row and fill colour is already cached.
+
+        Args:
+            y (int): The y-coordinate of the palette row in the spritesheet.
+            color (tuple): The colour the tiles are drawn over.
+
+        Returns:
+            bool: True if getBackground will not need to draw it.
+        """
+        return (self.maze.digest, y, tuple(color)) in backgrounds
+
+    def addBackground(self, y, color, background):
+        """Cache a background made by composeBackground, converting it to the display format.
+
+        Args:
+            y (int): The y-coordinate of the palette row in the spritesheet.
+            color (tuple): The colour the tiles are drawn over.
+            background (pygame.Surface): The background surface.
+        """
+        if pygame.display.get_surface() is not None:
+            background = background.convert()
+        backgrounds[(self.maze.digest, y, tuple(color))] = background
+
+    def composeBackground(self, y, color, cachedir=None):
+        """Draw a background, or load it from the cache folder, without touching the display,
+        so it can be done on the level loader thread.
+
+        Args:
+            y (int): The y-coordinate of the palette row in the spritesheet.
+            color (tuple): The colour the tiles are drawn over.
+            cachedir (str): The folder to keep the background in as a PNG, or None.
+
+        Returns:
+            pygame.Surface: The background surface, in the spritesheet's pixel format.
+        """
+        path = None
+        if cachedir is not None:
+            name = "background_%s_%d_%02x%02x%02x_%d.png" % ((self.maze.digest, y) + tuple(color[:3]) + (TILEWIDTH,))
+            path = os.path.join(cachedir, name)
+        if path is not None and os.path.exists(path):
+            return pygame.image.load(path)
+        background = pygame.surface.Surface(SCREENSIZE)
+        background.fill(color)
+        self.constructBackground(background, y)
+        if path is not None:
+            os.makedirs(cachedir, exist_ok=True)
+            pygame.image.save(background, path)
+        return background
 
     def constructBackground(self, background, y):
         """Construct the background for the game screen based on the maze data.
@@ -293,28 +549,8 @@ class MazeSprites(Spritesheet):
         Returns:
             pygame.Surface: The updated background surface.
         """
-        for row in list(range(self.data.shape[0])):
-            for col in list(range(self.data.shape[1])):
-                if self.data[row][col].isdigit():
-                    x = int(self.data[row][col]) + 12
-                    sprite = self.getImage(x, y)
-                    rotval = int(self.rotdata[row][col])
-                    sprite = self.rotate(sprite, rotval)
-                    background.blit(sprite, (col*TILEWIDTH, row*TILEHEIGHT))
-                elif self.data[row][col] == '=':
-                    sprite = self.getImage(10, 8)
-                    background.blit(sprite, (col*TILEWIDTH, row*TILEHEIGHT))
+        for col, row, x, tiley, rotval in self.maze.tiles.tolist():
+            sprite = self.getImage(x, y if tiley < 0 else tiley, rotval)
+            background.blit(sprite, (col*TILEWIDTH, row*TILEHEIGHT))
 
         return background
-
-    def rotate(self, sprite, value):
-        """Rotate the given sprite by the specified value.
-        
-        Args:
-            sprite (pygame.Surface): The sprite to rotate.
-            value (int): The rotation value in multiples of 90 degrees.
-            
-        Returns:
-            pygame.Surface: The rotated sprite.
-        """
-        return pygame.transform.rotate(sprite, value*90)
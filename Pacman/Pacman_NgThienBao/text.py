@@ -3,6 +3,56 @@ import pygame
 from vector import Vector2
 from constants import *
 
+TEXTFONT = "Pacman_NgThienBao/PressStart2P-Regular.ttf"
+
+fonts = {}
+glyphs = {}
+
+def getFont(fontpath, size):
+    """
+    Returns the shared font for a font file and size, opening it on first use.
+
+    Args:
+        fontpath (str): The path to the font file.
+        size (int): The font size.
+
+    Returns:
+        pygame.font.Font: The shared font.
+    """
+    key = (fontpath, size)
+    if key not in fonts:
+        fonts[key] = pygame.font.Font(fontpath, size)
+    return fonts[key]
+
+def renderDigits(fontpath, size, digits, color):
+    """
+    Composes a label for a string of digits from cached glyph surfaces.
+
+    Args:
+        fontpath (str): The path to the font file.
+        size (int): The font size.
+        digits (str): The digits to render.
+        color (tuple): The color of the text in RGB format.
+
+    Returns:
+        pygame.Surface: The label surface.
+    """
+    images = []
+    for digit in digits:
+        key = (fontpath, size, digit, color)
+        if key not in glyphs:
+            glyphs[key] = getFont(fontpath, size).render(digit, 1, color)
+        images.append(glyphs[key])
+    width = sum(image.get_width() for image in images)
+    height = max(image.get_height() for image in images)
+    label = pygame.Surface((width, height), pygame.SRCALPHA)
+    x = 0
+    for image in images:
+        label.blit(image, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        x += image.get_width()
+    return label
+
+
 class Text(object):
     def __init__(self, text, color, x, y, size, time=None, id=None, visible=True):
         """
@@ -28,7 +78,7 @@ class Text(object):
         self.lifespan = time
         self.label = None
         self.destroy = False
-        self.setupFont("Pacman_NgThienBao/PressStart2P-Regular.ttf")
+        self.setupFont(TEXTFONT)
         self.createLabel()
 
     def setupFont(self, fontpath):
@@ -38,13 +88,18 @@ class Text(object):
         Args:
             fontpath (str): The path to the font file.
         """
-        self.font = pygame.font.Font(fontpath, self.size)
+        self.fontpath = fontpath
+        self.font = getFont(fontpath, self.size)
 
     def createLabel(self):
         """
         Creates the label surface for the text.
+        Numbers such as the score and level are composed from cached digit glyphs.
         """
-        self.label = self.font.render(self.text, 1, self.color)
+        if self.text.isdigit():
+            self.label = renderDigits(self.fontpath, self.size, self.text, self.color)
+        else:
+            self.label = self.font.render(self.text, 1, self.color)
 
     def setText(self, newtext):
         """
@@ -76,10 +131,14 @@ class Text(object):
 
         Args:
             screen (pygame.Surface): The surface to render the text on.
+
+        Returns:
+            pygame.Rect or None: The area drawn on, or None if the text is hidden.
         """
         if self.visible:
             x, y = self.position.asTuple()
-            screen.blit(self.label, (x, y))
+            return screen.blit(self.label, (x, y))
+        return None
 
 
 class TextGroup(object):
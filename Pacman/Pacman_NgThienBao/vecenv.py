@@ -0,0 +1,405 @@
+import numpy as np
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from constants import *
+from simulation import Simulation
+from pauser import Pause
+from mazedata import MazeData
+from mazecompiler import loadMaze
+
+ACTIONS = [STOP, UP, DOWN, LEFT, RIGHT]
+# Pacman x, y, hướng, còn sống; 4 con ma x, y, chế độ; trái cây x, y, có mặt; mạng; màn
+NUMFEATURES = 21
+OBSERVATIONSIZE = NUMFEATURES + NROWS * NCOLS
+
+
+def preloadMazes():
+    """
+    Compiles every maze of MazeData, so the games of a process reuse them and
+    worker processes started afterwards find them in the cache.
+    """
+    for maze in MazeData().mazedict.values():
+        loadMaze("Pacman_NgThienBao/" + maze().name + ".txt")
+
+
+class EnvGame(Simulation):
+    """
+    A headless game for an environment. It adds up the points scored since the
+    last step and flags the game over instead of restarting by itself.
+
+    Attributes:
+        reward (int): The points scored since the reward was last cleared.
+        over (bool): Flag indicating whether Pacman lost his last life.
+        frames (int): The number of frames played since the game started.
+        pelletGrid (numpy.ndarray): The (NROWS, NCOLS) pellets left, 1 for a pellet and 2 for a power pellet.
+    """
+
+    def __init__(self, level=0, seed=None):
+        """
+        Initializes and starts an EnvGame object.
+
+        Args:
+            level (int): The level to start from.
+            seed (int): The seed of the random generator of the game, None to pick one.
+        """
+        Simulation.__init__(self, headless=True, seed=seed)
+        self.pelletGrid = np.zeros((NROWS, NCOLS), dtype=np.float32)
+        self.reset(level)
+
+    def reset(self, level=0):
+        """
+        Starts a new game.
+
+        Args:
+            level (int): The level to start from.
+        """
+        self.reward = 0
+        self.over = False
+        self.frames = 0
+        self.pause = Pause(True)
+        self.restartGame(level)
+
+    def setLevel(self, level):
+        """
+        Swaps a level into the game and fills the pellet grid from its pellets.
+
+        Args:
+            level (Level): The level to play.
+        """
+        Simulation.setLevel(self, level)
+        self.pelletGrid[:] = 0
+        for pellet in self.pellets.pelletLUT.values():
+            self.pelletGrid[pellet.row, pellet.column] = 2 if pellet.name == POWERPELLET else 1
+
+    def pelletEaten(self, pellet):
+        """
+        Clears an eaten pellet from the pellet grid.
+
+        Args:
+            pellet (Pellet): The pellet that was eaten.
+        """
+        self.pelletGrid[pellet.row, pellet.column] = 0
+
+    def gameOver(self):
+        """
+        Flags the game over.
+        """
+        self.over = True
+
+    def updateScore(self, points):
+        """
+        Updates the score and the reward.
+
+        Args:
+            points (int): The points to add.
+        """
+        Simulation.updateScore(self, points)
+        self.reward += points
+
+    def snapshotExtra(self):
+        """
+        Captures the pellet grid, the reward, the game over flag and the frame count.
+
+        Returns:
+            tuple: The copied state.
+        """
+        return self.pelletGrid.copy(), self.reward, self.over, self.frames
+
+    def restoreExtra(self, extra):
+        """
+        Puts back the state returned by snapshotExtra.
+
+        Args:
+            extra (tuple): The state.
+        """
+        grid, self.reward, self.over, self.frames = extra
+        self.pelletGrid[:] = grid
+
+    def observe(self, out):
+        """
+        Writes the state of the game into one row of an observation array.
+
+        Args:
+            out (numpy.ndarray): The OBSERVATIONSIZE row to write, positions in pixels.
+        """
+        pacman = self.pacman
+        out[0:4] = (pacman.position.x, pacman.position.y, pacman.direction, pacman.alive)
+        for i, ghost in enumerate(self.ghosts):
+            out[4 + 3*i:7 + 3*i] = (ghost.position.x, ghost.position.y, ghost.mode.current)
+        if self.fruit is not None:
+            out[16:19] = (self.fruit.position.x, self.fruit.position.y, 1)
+        else:
+            out[16:19] = 0
+        out[19:21] = (self.lives, self.level)
+        out[NUMFEATURES:] = self.pelletGrid.reshape(-1)
+
+
+class GameBatch(object):
+    """
+    Some games of an environment, stepped one after the other, in the process
+    of the environment or in one of its workers.
+
+    Attributes:
+        games (list): The EnvGame objects.
+        frameSkip (int): The number of frames each action is held for.
+        dt (float): The time of one frame.
+        maxFrames (int): The number of frames after which a game is cut short, 0 for no limit.
+    """
+
+    def __init__(self, size, frameSkip, dt, maxFrames, seed=None):
+        """
+        Initializes a GameBatch object.
+
+        Args:
+            size (int): The number of games.
+            frameSkip (int): The number of frames each action is held for.
+            dt (float): The time of one frame.
+            maxFrames (int): The number of frames after which a game is cut short, 0 for no limit.
+            seed (int): The seed of the first game, the others counting up from it, or None to pick them.
+        """
+        self.games = [EnvGame(seed=None if seed is None else seed + i) for i in range(size)]
+        self.frameSkip = frameSkip
+        self.dt = dt
+        self.maxFrames = maxFrames
+
+    def reset(self, observations):
+        """
+        Starts every game again.
+
+        Args:
+            observations (numpy.ndarray): The rows to write the first observations into.
+        """
+        for game, out in zip(self.games, observations):
+            game.reset()
+            game.observe(out)
+
+    def step(self, actions, observations, rewards, dones):
+        """
+        Plays one action in every game. Games that end are started again, and
+        their row gets the first observation of the new game.
+
+        Args:
+            actions (numpy.ndarray): The index in ACTIONS of the direction for each game.
+            observations (numpy.ndarray): The rows to write the observations into.
+            rewards (numpy.ndarray): The array to write the points scored into.
+            dones (numpy.ndarray): The array to write whether each game ended into.
+        """
+        for i, game in enumerate(self.games):
+            direction = ACTIONS[actions[i]]
+            game.reward = 0
+            for frame in range(self.frameSkip):
+                game.update(self.dt, direction)
+                game.frames += 1
+                if game.over:
+                    break
+            rewards[i] = game.reward
+            dones[i] = game.over or (self.maxFrames > 0 and game.frames >= self.maxFrames)
+            if dones[i]:
+                game.reset()
+            game.observe(observations[i])
+
+
+def getBuffers(buffer, numEnvs):
+    """
+    Lays the observation, reward and done arrays of an environment over one buffer.
+
+    Args:
+        buffer (buffer): The memory to use, at least getBufferSize(numEnvs) bytes.
+        numEnvs (int): The number of games.
+
+    Returns:
+        tuple: The (numEnvs, OBSERVATIONSIZE) observations, the rewards and the done flags.
+    """
+    observations = np.ndarray((numEnvs, OBSERVATIONSIZE), dtype=np.float32, buffer=buffer)
+    offset = observations.nbytes
+    rewards = np.ndarray(numEnvs, dtype=np.float32, buffer=buffer, offset=offset)
+    offset += rewards.nbytes
+    dones = np.ndarray(numEnvs, dtype=np.bool_, buffer=buffer, offset=offset)
+    return observations, rewards, dones
+
+
+def getBufferSize(numEnvs):
+    """
+    Returns the number of bytes getBuffers needs.
+
+    Args:
+        numEnvs (int): The number of games.
+
+    Returns:
+        int: The size in bytes.
+    """
+    return numEnvs * (OBSERVATIONSIZE * 4 + 4 + 1)
+
+
+def runWorker(pipe, name, numEnvs, start, stop, frameSkip, dt, maxFrames, seed):
+    """
+    Runs games start to stop of an environment in a worker process, writing
+    their results into the shared memory of the environment.
+
+    Args:
+        pipe (Connection): The end of the pipe the commands come in on.
+        name (str): The name of the shared memory.
+        numEnvs (int): The number of games in the environment.
+        start (int): The index of the first game of this worker.
+        stop (int): The index after the last game of this worker.
+        frameSkip (int): The number of frames each action is held for.
+        dt (float): The time of one frame.
+        maxFrames (int): The number of frames after which a game is cut short, 0 for no limit.
+        seed (int): The seed of the first game of this worker, or None to pick them.
+    """
+    memory = SharedMemory(name=name)
+    observations, rewards, dones = getBuffers(memory.buf, numEnvs)
+    batch = GameBatch(stop - start, frameSkip, dt, maxFrames, seed)
+    pipe.send(True)
+    while True:
+        command, actions = pipe.recv()
+        if command == "step":
+            batch.step(actions, observations[start:stop], rewards[start:stop], dones[start:stop])
+        elif command == "reset":
+            batch.reset(observations[start:stop])
+        else:
+            break
+        pipe.send(True)
+    del observations, rewards, dones
+    memory.close()
+
+
+class PacmanVecEnv(object):
+    """
+    Steps many independent headless games in lockstep for training agents.
+    Every step takes one action per game and returns the observations, rewards
+    and done flags of all games as NumPy arrays. Games that end are started again
+    at once, so the observation of a done game is the first of the next one.
+
+    With workers, the games are split between that many processes, which write
+    straight into arrays in shared memory. The mazes are compiled before the
+    workers start, and if a worker fails to start the others are stopped and
+    the shared memory is freed.
+
+    Attributes:
+        numEnvs (int): The number of games.
+        observations (numpy.ndarray): The (numEnvs, OBSERVATIONSIZE) observations, see EnvGame.observe.
+        rewards (numpy.ndarray): The points each game scored in the last step.
+        dones (numpy.ndarray): Flags indicating which games ended in the last step.
+        batch (GameBatch): The games, when they run in this process.
+        memory (SharedMemory): The memory holding the arrays, when the games run in workers.
+        pipes (list): The pipes to the workers.
+        processes (list): The worker processes.
+        slices (list): The (start, stop) games of each worker.
+    """
+
+    def __init__(self, numEnvs, workers=0, frameSkip=4, tickRate=60, maxFrames=0, seed=None):
+        """
+        Initializes a PacmanVecEnv object and starts its games.
+
+        Args:
+            numEnvs (int): The number of games.
+            workers (int): The number of worker processes, 0 to run the games in this process.
+            frameSkip (int): The number of frames each action is held for.
+            tickRate (int): The number of frames per second of game time.
+            maxFrames (int): The number of frames after which a game is cut short, 0 for no limit.
+            seed (int): The seed of game 0, game i getting seed + i, or None to pick them.
+        """
+        self.numEnvs = numEnvs
+        self.batch = None
+        self.memory = None
+        self.pipes = []
+        self.processes = []
+        self.slices = []
+        dt = 1.0 / tickRate
+        if workers <= 0:
+            self.observations, self.rewards, self.dones = getBuffers(bytearray(getBufferSize(numEnvs)), numEnvs)
+            self.batch = GameBatch(numEnvs, frameSkip, dt, maxFrames, seed)
+        else:
+            preloadMazes()
+            self.memory = SharedMemory(create=True, size=getBufferSize(numEnvs))
+            self.observations, self.rewards, self.dones = getBuffers(self.memory.buf, numEnvs)
+            try:
+                context = get_context()
+                bounds = np.linspace(0, numEnvs, min(workers, numEnvs) + 1).astype(int).tolist()
+                for start, stop in zip(bounds[:-1], bounds[1:]):
+                    pipe, child = context.Pipe()
+                    process = context.Process(target=runWorker, daemon=True,
+                                              args=(child, self.memory.name, numEnvs, start, stop, frameSkip, dt, maxFrames,
+                                                    None if seed is None else seed + start))
+                    process.start()
+                    child.close()
+                    self.pipes.append(pipe)
+                    self.processes.append(process)
+                    self.slices.append((start, stop))
+                for pipe in self.pipes:
+                    pipe.recv()
+            except BaseException:
+                self.close()
+                raise
+        self.reset()
+
+    def reset(self):
+        """
+        Starts every game again.
+
+        Returns:
+            numpy.ndarray: The first observations.
+        """
+        if self.batch is not None:
+            self.batch.reset(self.observations)
+        else:
+            self.command("reset", [None] * len(self.pipes))
+        self.rewards[:] = 0
+        self.dones[:] = False
+        return self.observations
+
+    def step(self, actions):
+        """
+        Plays one action in every game. The arrays returned are overwritten by the next step.
+
+        Args:
+            actions (numpy.ndarray): The index in ACTIONS of the direction for each game.
+
+        Returns:
+            tuple: The observations, rewards and done flags.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        if self.batch is not None:
+            self.batch.step(actions, self.observations, self.rewards, self.dones)
+        else:
+            self.command("step", [actions[start:stop] for start, stop in self.slices])
+        return self.observations, self.rewards, self.dones
+
+    def command(self, command, args):
+        """
+        Sends a command to every worker and waits for all of them to finish it.
+
+        Args:
+            command (str): The command, "step" or "reset".
+            args (list): The argument for each worker.
+        """
+        for pipe, arg in zip(self.pipes, args):
+            pipe.send((command, arg))
+        for pipe in self.pipes:
+            pipe.recv()
+
+    def close(self):
+        """
+        Stops the workers and frees the shared memory. Workers that are gone or
+        don't stop are terminated.
+        """
+        for pipe in self.pipes:
+            try:
+                pipe.send(("close", None))
+            except (OSError, ValueError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for pipe in self.pipes:
+            pipe.close()
+        self.pipes = []
+        self.processes = []
+        if self.memory is not None:
+            del self.observations, self.rewards, self.dones
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
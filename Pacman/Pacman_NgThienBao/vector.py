@@ -2,7 +2,14 @@
 import math 
 
 class Vector2(object):
-    """A class representing a 2D vector."""
+    """A class representing a 2D vector.
+
+    The operators return new vectors. The i-prefixed methods change the vector in
+    place and return it, so they can be chained without making temporaries. Only
+    use them on vectors the caller owns, never on a node's position.
+    """
+    __slots__ = ('x', 'y')
+    thresh = 0.000001
 
     def __init__(self, x=0, y=0):
         """Initialize the Vector2 object.
@@ -13,7 +20,6 @@ class Vector2(object):
         """
         self.x = x
         self.y = y
-        self.thresh = 0.000001
 
     def __add__(self, other):
         """Add two vectors.
@@ -94,6 +100,84 @@ class Vector2(object):
                 return True
         return False
 
+    def set(self, x, y):
+        """Set both coordinates in place.
+
+        Args:
+            x (float): The new x-coordinate.
+            y (float): The new y-coordinate.
+
+        Returns:
+            Vector2: This vector.
+        """
+        self.x = x
+        self.y = y
+        return self
+
+    def iadd(self, other):
+        """Add another vector in place.
+
+        Args:
+            other (Vector2): The vector to be added.
+
+        Returns:
+            Vector2: This vector.
+        """
+        self.x += other.x
+        self.y += other.y
+        return self
+
+    def isub(self, other):
+        """Subtract another vector in place.
+
+        Args:
+            other (Vector2): The vector to be subtracted.
+
+        Returns:
+            Vector2: This vector.
+        """
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    def imul(self, scalar):
+        """Multiply by a scalar in place.
+
+        Args:
+            scalar (float): The scalar value to multiply the vector by.
+
+        Returns:
+            Vector2: This vector.
+        """
+        self.x *= scalar
+        self.y *= scalar
+        return self
+
+    def iaddScaled(self, other, scalar):
+        """Add another vector multiplied by a scalar in place, as in self += other * scalar.
+
+        Args:
+            other (Vector2): The vector to be scaled and added.
+            scalar (float): The scalar value to multiply the other vector by.
+
+        Returns:
+            Vector2: This vector.
+        """
+        self.x += other.x * scalar
+        self.y += other.y * scalar
+        return self
+
+    def distanceSquared(self, other):
+        """Calculate the squared distance to another vector without making a temporary.
+
+        Args:
+            other (Vector2): The other vector.
+
+        Returns:
+            float: The squared magnitude of the difference of the two vectors.
+        """
+        return (self.x - other.x)**2 + (self.y - other.y)**2
+
     def magnitudeSquared(self):
         """Calculate the squared magnitude of the vector.
 